@@ -1,21 +1,29 @@
-import random
 from mailbox.Mailbox import Mailbox
-from scipy.spatial.distance import cdist
 
 import numpy as np
 from mesa import Agent
 
-from message.Message import Message
-from message.MessagePerformative import MessagePerformative
+from knowledge import EMPTY, UNEXPLORED, Knowledge
 from message.MessageService import MessageService
 
-EMPTY = -1
 WALL = -1
-UNEXPLORED = -2
+
+# Cell of the 3*3 observations reached by each move
+NEIGHBOUR_CELLS = {
+    "move_Up": (0, 1),
+    "move_Right": (1, 2),
+    "move_Down": (2, 1),
+    "move_Left": (1, 0),
+}
 
 
 class RobotAgent(Agent):
-    def __init__(self, model, knowledge: dict):
+    color_to_gather = -1  # Color of the wastes gathered by the robot, set by each subclass
+    # Retention policy of the mailbox: keep the last messages and/or the messages of the last steps
+    mailbox_max_messages = 1000
+    mailbox_max_age = None
+
+    def __init__(self, model, knowledge: Knowledge = None):
         super().__init__(model)
         self.knowledge = knowledge
         self.colors_ids = {0: "green", 1: "yellow", 2: "red"}
@@ -31,14 +39,24 @@ class RobotAgent(Agent):
             "nothing": 8,
         }
         self.grid_size = self.model.grid_size
-        self.color_to_gather = -1
+        self.frontier = None  # FrontierIndex of the knowledge grid, set with the knowledge
+        # Flat offsets of a 3*3 block of the knowledge grid, and the cells changed by the last update
+        size = self.grid_size + 2
+        self.__block = (np.arange(3)[:, None] * size + np.arange(3)[None, :]).reshape(-1)
+        self.__changes = (self.__block[:0], np.zeros(0, dtype=np.int8))
 
         self.green_threshold = 1 / 3
         self.yellow_threshold = 2 / 3
         self.red_threshold = 1
 
-        self.__mailbox = Mailbox()
+        self.__mailbox = Mailbox(
+            max_messages=self.mailbox_max_messages,
+            max_age=self.mailbox_max_age,
+            clock=lambda: self.model.steps,
+        )
         self.__messages_service = MessageService.get_instance()
+        self.__blackboard = self.__messages_service.get_blackboard()
+        self.__blackboard.register_reader(self.get_id())
 
     def get_pos(self):
         i, j = self.pos
@@ -47,27 +65,53 @@ class RobotAgent(Agent):
             i + 1,
         )
 
+    def border_map(self):
+        """Return the cells of the observation outside of the grid."""
+        return self.knowledge.radioactivity == WALL
+
+    def wall_map(self):
+        """Return the cells of the observation the robot can't stand on:
+        outside of the grid or walls."""
+        return self.border_map() | (self.knowledge.is_wall == 1)
+
+    def knowledge_to_grid(self, position):
+        """Convert a position (row, column) of the knowledge grid to a position of the mesa grid."""
+        row, column = position
+        return (column - 1, self.grid_size - row)
+
+    def follow_field(self, field):
+        """Move down a distance field of the planner, avoiding the cells taken by other robots."""
+        moves = [
+            move
+            for move in self.model.planner.downhill_moves(field, self.pos)
+            if not self.knowledge.other_robots[NEIGHBOUR_CELLS[move]] == 1
+        ]
+        if len(moves) > 0:
+            return self.actions_dict[self.random.choice(moves)]
+        return self.random_walk()
+
     def deliberate(self):
         pass
 
     def update(self, percepts, action, other_grids=None):
-        self.knowledge["carried_by_others"] = {0: {}, 1: {}, 2: {}}
-        if other_grids is not None:
-            for subgrid, (i, j), carried, color in other_grids:
-                for k in range(3):
-                    for l in range(3):
-                        if subgrid[k][l] != -2:
-                            self.knowledge["grid"][self.grid_size - i + k][
-                                j - 1 + l
-                            ] = subgrid[k][l]
-
-                self.knowledge["carried_by_others"][color][(i, j)] = carried
+        self.knowledge.carried_by_others = {0: {}, 1: {}, 2: {}}
+        grid = self.knowledge.grid.reshape(-1)
+        if other_grids:
+            for _, _, (i, j), carried, color in other_grids:
+                self.knowledge.carried_by_others[color][(i, j)] = carried
+            cells = np.concatenate([message[0] for message in other_grids])
+            values = np.concatenate([message[1] for message in other_grids])
+            # the latest publication of a cell wins: keep its last occurrence only
+            cells, last = np.unique(cells[::-1], return_index=True)
+            values = values[::-1][last]
+            self.frontier.discard_cells(cells[grid[cells] == UNEXPLORED])
+            grid[cells] = values
 
         if action == self.actions_dict["pick"] and percepts["success"]:
-            if self.knowledge["carried"] == []:
-                self.knowledge["carried"] = [self.knowledge["color_waste"][1][1]]
-            elif self.knowledge["carried"] == [self.knowledge["color_waste"][1][1]]:
-                self.knowledge["carried"] = [self.knowledge["color_waste"][1][1] + 1]
+            if not self.knowledge.is_carrying():
+                self.knowledge.carried = self.knowledge.color_waste[1][1]
+            elif self.knowledge.carried == self.knowledge.color_waste[1][1]:
+                self.knowledge.carried = self.knowledge.color_waste[1][1] + 1
 
         elif (
             action
@@ -78,52 +122,60 @@ class RobotAgent(Agent):
             ]
             and percepts["success"]
         ):  # The robot drops some waste
-            self.knowledge["carried"] = []
+            self.knowledge.carried = EMPTY
 
+        # Only the cells whose value changed are shared with the other robots
         i, j = self.get_pos()
-        self.knowledge["grid"][
-            self.grid_size - i : self.grid_size - i + 3, j - 1 : j + 2
-        ] = percepts["color_waste"]
+        cells = self.observed_cells(i, j)
+        values = percepts["color_waste"].reshape(-1).astype(grid.dtype)
+        changed = grid[cells] != values
+        self.__changes = (cells[changed], values[changed])
+        grid[cells] = values
+        self.model.assignment.observe(cells, values)
+        self.frontier.discard_block(self.grid_size - i, j - 1, percepts["color_waste"])
 
-        self.knowledge.update(percepts)
+        self.knowledge.observe(percepts)
 
     def step(self):
         action = self.deliberate()
         percepts = self.model.do(self, action)
+        self.perceive(percepts, action)
+
+    def perceive(self, percepts, action):
+        """Update the knowledge with the result of an action and share it with the other robots."""
         other_grids = self.read_messages()
         self.update(percepts, action, other_grids)
         self.broadcast_message()
 
     def read_messages(self):
-        all_grids = []
-        list_messages = self.get_new_messages()
-        for message in list_messages:
-            content = message.get_content()
-            all_grids.append(content)
-        return all_grids
+        return self.__blackboard.read(self.get_id())
 
     def broadcast_message(self):
-        # Broadcast to all agents
-        for agent_id in self.knowledge["id"]:
-            if agent_id != self.get_id():
-                i, j = self.get_pos()
-                sub_grid = self.knowledge["grid"][
-                    self.grid_size - i : self.grid_size - i + 3, j - 1 : j + 2
-                ]
-
-                self.send_message(
-                    Message(
-                        self.get_id(),
-                        agent_id,
-                        MessagePerformative.QUERY_REF,
-                        (
-                            sub_grid,
-                            (i, j),
-                            self.knowledge["carried"],
-                            self.color_to_gather,
-                        ),
-                    )
-                )
+        # Publish once on the blackboard, read by all the other agents
+        cells, values = self.__changes
+        self.__blackboard.publish(
+            self.get_id(),
+            (
+                cells,
+                values,
+                self.get_pos(),
+                self.knowledge.carried,
+                self.color_to_gather,
+            ),
+        )
+
+    def observed_cells(self, i, j):
+        """Return the flat indices in the knowledge grid of the 3*3 cells observed from (i, j)."""
+        return (self.grid_size - i) * len(self.knowledge.grid) + (j - 1) + self.__block
+
+    def assignment_class(self):
+        """Return the priority of the robot when wastes are assigned (lowest first),
+        or None if it can't pick a waste of its color."""
+        if self.knowledge.carried == self.color_to_gather:
+            return 0
+        if not self.knowledge.is_carrying():
+            return 1
+        return None
 
     def get_id(self):
         return self.unique_id
@@ -154,171 +206,181 @@ class RobotAgent(Agent):
 
 
 class RandomGreenAgent(RobotAgent):
+    color_to_gather = 0  # Can only gather green wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
         self.threshold = self.green_threshold
-        self.color_to_gather = 0  # Can only gather green wastes
 
     def deliberate(self):
-        if self.knowledge["color_waste"][1, 1] == self.color_to_gather and (
-            len(self.knowledge["carried"]) == 0
-            or self.knowledge["carried"][0] == self.color_to_gather
+        if self.knowledge.color_waste[1, 1] == self.color_to_gather and (
+            not self.knowledge.is_carrying()
+            or self.knowledge.carried == self.color_to_gather
         ):
             return self.actions_dict["pick"]
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["is_waste_disposal"][1, 1] == 1
+            self.knowledge.is_carrying()
+            and self.knowledge.is_waste_disposal[1, 1] == 1
         ):
             return self.actions_dict[
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             ]
 
         possible_actions = []
+        walls = self.wall_map()
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["color_waste"][1, 1] == 0
+            self.knowledge.is_carrying()
+            and self.knowledge.color_waste[1, 1] == 0
         ):
             possible_actions.append(
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             )
 
-        if 0 <= self.knowledge["radioactivity"][1, 2] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 2] <= self.threshold and not walls[1, 2]:
             possible_actions.append("move_Right")
 
-        if 0 <= self.knowledge["radioactivity"][0, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[0, 1] <= self.threshold and not walls[0, 1]:
             possible_actions.append("move_Up")
 
-        if 0 <= self.knowledge["radioactivity"][1, 0] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 0] <= self.threshold and not walls[1, 0]:
             possible_actions.append("move_Left")
 
-        if 0 <= self.knowledge["radioactivity"][2, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[2, 1] <= self.threshold and not walls[2, 1]:
             possible_actions.append("move_Down")
 
         if len(possible_actions) == 0:
             action = "nothing"
         else:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
 
         if action == "release":
-            action += "_" + self.colors_ids[self.knowledge["carried"][0]]
+            action += "_" + self.colors_ids[self.knowledge.carried]
 
         return self.actions_dict[action]
 
 
 class RandomYellowAgent(RobotAgent):
+    color_to_gather = 1  # Can only gather yellow wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
         self.threshold = self.yellow_threshold
-        self.color_to_gather = 1  # Can only gather yellow wastes
 
     def deliberate(self):
-        if self.knowledge["color_waste"][1, 1] == self.color_to_gather and (
-            len(self.knowledge["carried"]) == 0
-            or self.knowledge["carried"][0] == self.color_to_gather
+        if self.knowledge.color_waste[1, 1] == self.color_to_gather and (
+            not self.knowledge.is_carrying()
+            or self.knowledge.carried == self.color_to_gather
         ):
             return self.actions_dict["pick"]
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["is_waste_disposal"][1, 1] == 1
+            self.knowledge.is_carrying()
+            and self.knowledge.is_waste_disposal[1, 1] == 1
         ):
             return self.actions_dict[
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             ]
 
         possible_actions = []
+        walls = self.wall_map()
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["color_waste"][1, 1] == 0
+            self.knowledge.is_carrying()
+            and self.knowledge.color_waste[1, 1] == 0
         ):
             possible_actions.append(
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             )
 
-        if 0 <= self.knowledge["radioactivity"][1, 2] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 2] <= self.threshold and not walls[1, 2]:
             possible_actions.append("move_Right")
 
-        if 0 <= self.knowledge["radioactivity"][0, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[0, 1] <= self.threshold and not walls[0, 1]:
             possible_actions.append("move_Up")
 
-        if 0 <= self.knowledge["radioactivity"][1, 0] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 0] <= self.threshold and not walls[1, 0]:
             possible_actions.append("move_Left")
 
-        if 0 <= self.knowledge["radioactivity"][2, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[2, 1] <= self.threshold and not walls[2, 1]:
             possible_actions.append("move_Down")
 
         if len(possible_actions) == 0:
             action = "nothing"
         else:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
 
         if action == "release":
-            action = "_" + self.colors_ids[self.knowledge["carried"][0]]
+            action = "_" + self.colors_ids[self.knowledge.carried]
 
         return self.actions_dict[action]
 
 
 class RandomRedAgent(RobotAgent):
+    color_to_gather = 2  # Can only gather red wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
         self.threshold = self.red_threshold
-        self.color_to_gather = 2  # Can only gather red wastes
 
     def deliberate(self):
-        if self.knowledge["color_waste"][1, 1] == self.color_to_gather and (
-            len(self.knowledge["carried"]) == 0
+        if self.knowledge.color_waste[1, 1] == self.color_to_gather and (
+            not self.knowledge.is_carrying()
         ):
             return self.actions_dict["pick"]
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["is_waste_disposal"][1, 1] == 1
+            self.knowledge.is_carrying()
+            and self.knowledge.is_waste_disposal[1, 1] == 1
         ):
             return self.actions_dict[
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             ]
 
         possible_actions = []
+        walls = self.wall_map()
 
         if (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["color_waste"][1, 1] == 0
+            self.knowledge.is_carrying()
+            and self.knowledge.color_waste[1, 1] == 0
         ):
             possible_actions.append(
-                "release_" + self.colors_ids[self.knowledge["carried"][0]]
+                "release_" + self.colors_ids[self.knowledge.carried]
             )
 
-        if 0 <= self.knowledge["radioactivity"][1, 2] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 2] <= self.threshold and not walls[1, 2]:
             possible_actions.append("move_Right")
 
-        if 0 <= self.knowledge["radioactivity"][0, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[0, 1] <= self.threshold and not walls[0, 1]:
             possible_actions.append("move_Up")
 
-        if 0 <= self.knowledge["radioactivity"][1, 0] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[1, 0] <= self.threshold and not walls[1, 0]:
             possible_actions.append("move_Left")
 
-        if 0 <= self.knowledge["radioactivity"][2, 1] <= self.threshold:
+        if 0 <= self.knowledge.radioactivity[2, 1] <= self.threshold and not walls[2, 1]:
             possible_actions.append("move_Down")
 
         if len(possible_actions) == 0:
             action = "nothing"
         else:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
 
         if action == "release":
-            action += "_" + self.colors_ids[self.knowledge["carried"][0]]
+            action += "_" + self.colors_ids[self.knowledge.carried]
 
         return self.actions_dict[action]
 
 
 class GreenAgent(RobotAgent):
+    color_to_gather = 0  # Can only gather green wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
-        self.color_to_gather = 0  # Can only gather green wastes
-        self.begin = True
+        green_column, yellow_column = self.model.deposit_columns
+        self.green_deposit_position = [1, green_column + 1]
+        self.yellow_deposit_position = [self.grid_size, green_column + 1]
+        self.red_deposit_position = [self.grid_size, yellow_column + 1]
         self.yellow_deposit_not_available = False
         self.go_up = True
 
@@ -326,30 +388,30 @@ class GreenAgent(RobotAgent):
         possible_actions = []
 
         if (
-            self.knowledge["radioactivity"][1, 2] <= self.green_threshold
+            self.knowledge.radioactivity[1, 2] <= self.green_threshold
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
 
         if (
-            self.knowledge["radioactivity"][0, 1] <= self.green_threshold
+            self.knowledge.radioactivity[0, 1] <= self.green_threshold
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
 
         if (
-            self.knowledge["radioactivity"][1, 0] <= self.green_threshold
+            self.knowledge.radioactivity[1, 0] <= self.green_threshold
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if (
-            self.knowledge["radioactivity"][2, 1] <= self.green_threshold
+            self.knowledge.radioactivity[2, 1] <= self.green_threshold
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
 
-        action = random.choice(possible_actions)
+        action = self.random.choice(possible_actions)
 
         return self.actions_dict[action]
 
@@ -361,79 +423,48 @@ class GreenAgent(RobotAgent):
             return self.random_walk()
 
     def find_nearest_unexplored(self):
-        targets = np.argwhere(self.knowledge["grid"] == UNEXPLORED)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (position[1] <= self.green_deposit_position[1]).any()
-            ]
-        )  # do not look for green waste in green deposit
-
-        if len(targets) == 0:
-            return None
-
-        x, y = self.get_pos()
-
-        distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
-        sorted_indices = np.lexsort(
-            (targets[:, 1], -targets[:, 0], distances)
-        )  # en cas d'égalité des distances, le plus en haut à gauche gagne
-        return tuple(targets[sorted_indices[0]])
-
-    def wall_map(self):
-        return self.knowledge["radioactivity"] == WALL
-
-    def is_on_yellow_deposit(self):
-        return self.get_pos() == self.find_nearest_yellow_deposit()
+        # do not look for green waste in green deposit
+        # en cas d'égalité des distances, le plus en haut à gauche gagne
+        return self.frontier.nearest(
+            self.get_pos(), max_column=self.green_deposit_position[1]
+        )
 
     def is_on_green_deposit(self):
         return (
-            (self.wall_map()[0, :]).all()
-            and (self.knowledge["radioactivity"][1:, 2] > self.green_threshold).all()
-            and (self.knowledge["radioactivity"][1:, :2] <= self.green_threshold).all()
+            (self.border_map()[0, :]).all()
+            and (self.knowledge.radioactivity[1:, 2] > self.green_threshold).all()
+            and (self.knowledge.radioactivity[1:, :2] <= self.green_threshold).all()
         )
 
     def is_on_correct_waste(self):
-        return self.knowledge["color_waste"][1, 1] == self.color_to_gather
+        return self.knowledge.color_waste[1, 1] == self.color_to_gather
 
     def must_deliver(self):
         return (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["carried"][0] != self.color_to_gather
+            self.knowledge.is_carrying()
+            and self.knowledge.carried != self.color_to_gather
         )
 
     def has_one_correct_waste(self):
         return (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["carried"][0] == self.color_to_gather
+            self.knowledge.is_carrying()
+            and self.knowledge.carried == self.color_to_gather
         )
 
     def go_to_green_deposit(self):
-        possible_actions = []
-        if not self.wall_map()[0, 1] and not self.knowledge["other_robots"][0, 1] == 1:
-            possible_actions.append("move_Up")
-
-        if (
-            self.knowledge["radioactivity"][1, 2] <= self.green_threshold
-            and not self.knowledge["other_robots"][1, 2] == 1
-        ):
-            possible_actions.append("move_Right")
-
-        if len(possible_actions) > 0:
-            action = random.choice(possible_actions)
-            return self.actions_dict[action]
-        else:
-            return self.random_walk()
+        field = self.model.planner.point_field(
+            self.knowledge_to_grid(self.green_deposit_position), self.green_threshold
+        )
+        return self.follow_field(field)
 
     def go_to_init_position(self):
         if (
-            self.knowledge["radioactivity"][1, 2] <= self.green_threshold
-            and not self.knowledge["other_robots"][1, 2] == 1
+            self.knowledge.radioactivity[1, 2] <= self.green_threshold
+            and not self.knowledge.other_robots[1, 2] == 1
         ):
             action = "move_Right"
 
-        elif not self.knowledge["other_robots"][2, 1] == 1:
+        elif not self.knowledge.other_robots[2, 1] == 1:
             action = "move_Down"
 
         else:
@@ -441,39 +472,23 @@ class GreenAgent(RobotAgent):
         return self.actions_dict[action]
 
     def find_nearest_yellow_deposit(self):
-        targets = np.argwhere(self.knowledge["grid"] == EMPTY)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (
-                    (position[1] <= self.yellow_deposit_position[1]).any()
-                    and position[0] not in [0, len(self.knowledge["grid"]) - 1]
-                    and (position != self.green_deposit_position).any()
-                )
-            ]
-        )  # do not look for green waste in green deposit
-        if len(targets) == 0:
-            return None
+        # the slots overflow on the columns on the left of the deposit when it is full
+        return self.model.yellow_deposit_slots.nearest(self.get_pos())
 
-        x, y = self.get_pos()
-
-        distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
-        sorted_indices = np.lexsort(
-            (distances, -targets[:, 1])
-        )  # en cas d'égalité des positions en x, le plus proche gagne
-        return tuple(targets[sorted_indices[0]])
-
-    def go_to_yellow_deposit(self):
-        targetx, targety = self.find_nearest_yellow_deposit()
-        return self.reach_location(targetx, targety)
+    def go_to_yellow_deposit(self, target):
+        if target is None:
+            # no free place known on the yellow deposit, head for its column
+            column = self.knowledge_to_grid(self.yellow_deposit_position)[0]
+            field = self.model.planner.column_field(column, self.green_threshold)
+            return self.follow_field(field)
+        return self.reach_location(*target)
 
     def can_release(self):
-        return self.knowledge["color_waste"][1, 1] == EMPTY
+        return self.knowledge.color_waste[1, 1] == EMPTY
 
     def release(self):
         return self.actions_dict[
-            "release_" + self.colors_ids[self.knowledge["carried"][0]]
+            "release_" + self.colors_ids[self.knowledge.carried]
         ]
 
     def pick(self):
@@ -486,131 +501,41 @@ class GreenAgent(RobotAgent):
             return self.deliberate()
 
     def reachable_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (position != self.green_deposit_position).any()
-            ]
-        )  # do not look for green waste in green deposit
-
-        if len(targets) == 0:
-            return None
-
-        prio1 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if self.knowledge["carried_by_others"][self.color_to_gather][pos]
-            == [self.color_to_gather]
-        ]
-
-        prio2 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio1, prio2 = [], []
-
-        x, y = self.get_pos()
-        if self.knowledge["carried"] == [self.color_to_gather]:
-            prio1.append((x, y))
-
-        elif len(self.knowledge["carried"]) == 0:
-            prio2.append((x, y))
-
-        
-
-        attributions, targets = self.attribution(prio1, targets)
-        attributions, targets = self.attribution(prio2, targets, attributions)
-        return (x, y) in attributions
-
-    def attribution(self, positions, targets, attributions={}):
-        positions = np.array(positions)
-        targets = np.array(targets)
-        while len(positions) > 0 and len(targets) > 0:
-            mat = cdist(positions, targets)
-            min_id = np.argmin(mat)
-            i, j = np.unravel_index(min_id, mat.shape)
-            attributions[tuple(positions[i])] = tuple(targets[j])
-            positions = np.array(np.delete(positions, i, axis=0))
-            targets = np.array(np.delete(targets, j, axis=0))
-
-        return attributions, targets
+        return self.model.assignment.target(self) is not None
 
     def find_nearest_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (position != self.green_deposit_position).any()
-            ]
-        )  # do not look for green waste in green deposit
-
-        if len(targets) == 0:
-            return None
-
-        prio1 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if self.knowledge["carried_by_others"][self.color_to_gather][pos]
-            == [self.color_to_gather]
-        ]
-
-        prio2 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio1, prio2 = [], []
-
-        x, y = self.get_pos()
-        if self.knowledge["carried"] == [self.color_to_gather]:
-            prio1.append((x, y))
-
-        elif len(self.knowledge["carried"]) == 0:
-            prio2.append((x, y))
-
-        attributions, targets = self.attribution(prio1, targets)
-        attributions, targets = self.attribution(prio2, targets, attributions)
-        if (x, y) in attributions:
-            return tuple(attributions[(x, y)])
-        else:
-            return None
+        return self.model.assignment.target(self)
 
     def reach_location(self, targetx, targety):
         possible_actions = []
         x, y = self.get_pos()
         if (
             targetx > x
-            and not self.knowledge["other_robots"][0, 1] == 1
+            and not self.knowledge.other_robots[0, 1] == 1
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
         elif (
             targetx < x
-            and not self.knowledge["other_robots"][2, 1] == 1
+            and not self.knowledge.other_robots[2, 1] == 1
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
         if (
             targety > y
-            and not self.knowledge["other_robots"][1, 2] == 1
+            and not self.knowledge.other_robots[1, 2] == 1
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
         elif (
             targety < y
-            and not self.knowledge["other_robots"][1, 0] == 1
+            and not self.knowledge.other_robots[1, 0] == 1
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if len(possible_actions) > 0:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
             return self.actions_dict[action]
         else:
             return self.random_walk()
@@ -623,31 +548,13 @@ class GreenAgent(RobotAgent):
         return self.reach_location(targetx, targety)
 
     def deliberate(self):
-        if self.begin:
-            self.green_deposit_position = [
-                1,
-                (len(self.knowledge["grid"]) - 2)
-                - 2 * (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-
-            self.yellow_deposit_position = [
-                len(self.knowledge["grid"]) - 2,
-                (len(self.knowledge["grid"]) - 2)
-                - 2 * (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-            self.red_deposit_position = [
-                len(self.knowledge["grid"]) - 2,
-                (len(self.knowledge["grid"]) - 2)
-                - (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-            self.begin = False
-
         if self.must_deliver():
-            if self.is_on_yellow_deposit():
+            target = self.find_nearest_yellow_deposit()
+            if self.get_pos() == target:
                 return self.act_in_yellow_deposit()
 
             else:
-                return self.go_to_yellow_deposit()
+                return self.go_to_yellow_deposit(target)
 
         if self.reachable_waste():
             return self.reach_waste()
@@ -665,10 +572,14 @@ class GreenAgent(RobotAgent):
 
 
 class YellowAgent(RobotAgent):
+    color_to_gather = 1  # Can only gather yellow wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
-        self.color_to_gather = 1  # Can only gather yellow wastes
-        self.begin = True
+        green_column, yellow_column = self.model.deposit_columns
+        self.green_deposit_position = [1, green_column + 1]
+        self.yellow_deposit_position = [self.grid_size, green_column + 1]
+        self.red_deposit_position = [self.grid_size, yellow_column + 1]
         self.red_deposit_not_available = False
         self.go_up = True
 
@@ -676,30 +587,30 @@ class YellowAgent(RobotAgent):
         possible_actions = []
 
         if (
-            self.knowledge["radioactivity"][1, 2] <= self.yellow_threshold
+            self.knowledge.radioactivity[1, 2] <= self.yellow_threshold
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
 
         if (
-            self.knowledge["radioactivity"][0, 1] <= self.yellow_threshold
+            self.knowledge.radioactivity[0, 1] <= self.yellow_threshold
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
 
         if (
-            self.knowledge["radioactivity"][1, 0] <= self.yellow_threshold
+            self.knowledge.radioactivity[1, 0] <= self.yellow_threshold
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if (
-            self.knowledge["radioactivity"][2, 1] <= self.yellow_threshold
+            self.knowledge.radioactivity[2, 1] <= self.yellow_threshold
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
 
-        action = random.choice(possible_actions)
+        action = self.random.choice(possible_actions)
 
         return self.actions_dict[action]
 
@@ -711,77 +622,58 @@ class YellowAgent(RobotAgent):
             return self.random_walk()
 
     def find_nearest_unexplored(self):
-        targets = np.argwhere(self.knowledge["grid"] == UNEXPLORED)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (position[1] <= self.red_deposit_position[1]).any()
-            ]
-        )  # do not look for green waste in green deposit
-        if len(targets) == 0:
-            return None
-
-        x, y = self.get_pos()
-
-        distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
-        sorted_indices = np.lexsort(
-            (targets[:, 1], -targets[:, 0], distances)
-        )  # en cas d'égalité des distances, le plus en haut à gauche gagne
-        return tuple(targets[sorted_indices[0]])
-
-    def wall_map(self):
-        return self.knowledge["radioactivity"] == WALL
+        # do not look for yellow waste in red deposit
+        # en cas d'égalité des distances, le plus en haut à gauche gagne
+        return self.frontier.nearest(
+            self.get_pos(), max_column=self.red_deposit_position[1]
+        )
 
     def is_on_yellow_deposit(self):
         return (
-            (self.wall_map()[2, :]).all()
-            and (self.knowledge["radioactivity"][:2, 2] > self.green_threshold).all()
-            and (self.knowledge["radioactivity"][:, :2] <= self.green_threshold).all()
+            (self.border_map()[2, :]).all()
+            and (self.knowledge.radioactivity[:2, 2] > self.green_threshold).all()
+            and (self.knowledge.radioactivity[:, :2] <= self.green_threshold).all()
         )
 
-    def is_on_red_deposit(self):
-        return self.find_nearest_deposit() == self.get_pos()
-
     def is_on_green_deposit(self):
         return (
-            (self.wall_map()[0, :]).all()
-            and (self.knowledge["radioactivity"][1:, 2] > self.green_threshold).all()
-            and (self.knowledge["radioactivity"][:, :2] <= self.green_threshold).all()
+            (self.border_map()[0, :]).all()
+            and (self.knowledge.radioactivity[1:, 2] > self.green_threshold).all()
+            and (self.knowledge.radioactivity[:, :2] <= self.green_threshold).all()
         )
 
     def is_on_correct_waste(self):
-        return self.knowledge["color_waste"][1, 1] == self.color_to_gather
+        return self.knowledge.color_waste[1, 1] == self.color_to_gather
 
     def must_deliver(self):
         return (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["carried"][0] != self.color_to_gather
+            self.knowledge.is_carrying()
+            and self.knowledge.carried != self.color_to_gather
         )
 
     def has_one_correct_waste(self):
         return (
-            len(self.knowledge["carried"]) > 0
-            and self.knowledge["carried"][0] == self.color_to_gather
+            self.knowledge.is_carrying()
+            and self.knowledge.carried == self.color_to_gather
         )
 
     def go_to_init_position(self):
         if not self.wall_map()[0, 1]:
             if (
-                self.knowledge["radioactivity"][1, 1] <= self.green_threshold
-                and not self.knowledge["other_robots"][1, 2] == 1
+                self.knowledge.radioactivity[1, 1] <= self.green_threshold
+                and not self.knowledge.other_robots[1, 2] == 1
             ):
                 action = "move_Right"
             elif (
-                self.knowledge["radioactivity"][1, 0] > self.green_threshold
-                and not self.knowledge["other_robots"][1, 0] == 1
+                self.knowledge.radioactivity[1, 0] > self.green_threshold
+                and not self.knowledge.other_robots[1, 0] == 1
             ):
                 action = "move_Left"
-            elif not self.knowledge["other_robots"][0, 1] == 1:
+            elif not self.knowledge.other_robots[0, 1] == 1:
                 action = "move_Up"
             else:
                 return self.random_walk()
-        elif not self.knowledge["other_robots"][1, 0] == 1:
+        elif not self.knowledge.other_robots[1, 0] == 1:
             action = "move_Left"
         else:
             action = "nothing"
@@ -789,59 +681,29 @@ class YellowAgent(RobotAgent):
         return self.actions_dict[action]
 
     def go_to_yellow_deposit(self):
-        if not self.wall_map()[2, 1] and not self.knowledge["other_robots"][2, 1] == 1:
-            action = "move_Down"
-
-        elif (
-            self.knowledge["radioactivity"][1, 2] <= self.green_threshold
-            and not self.knowledge["other_robots"][1, 2] == 1
-        ):
-            action = "move_Right"
-
-        elif (
-            self.knowledge["radioactivity"][1, 1] > self.green_threshold
-            and not self.knowledge["other_robots"][1, 0] == 1
-        ):
-            action = "move_Left"
-
-        else:
-            return self.random_walk()
-
-        return self.actions_dict[action]
+        field = self.model.planner.point_field(
+            self.knowledge_to_grid(self.yellow_deposit_position), self.yellow_threshold
+        )
+        return self.follow_field(field)
 
     def find_nearest_deposit(self):
-        targets = np.argwhere(self.knowledge["grid"] == EMPTY)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-                if (
-                    (position[1] <= self.red_deposit_position[1]).any()
-                    and position[0] not in [0, len(self.knowledge["grid"]) - 1]
-                )
-            ]
-        )  # do not look for green waste in green deposit
-        if len(targets) == 0:
-            return None
+        # the slots overflow on the columns on the left of the deposit when it is full
+        return self.model.red_deposit_slots.nearest(self.get_pos())
 
-        x, y = self.get_pos()
-
-        distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
-        sorted_indices = np.lexsort(
-            (distances, -targets[:, 1])
-        )  # en cas d'égalité des positions en x, le plus proche gagne
-        return tuple(targets[sorted_indices[0]])
-
-    def go_to_red_deposit(self):
-        targetx, targety = self.find_nearest_deposit()
-        return self.reach_location(targetx, targety)
+    def go_to_red_deposit(self, target):
+        if target is None:
+            # no free place known on the red deposit, head for its column
+            column = self.knowledge_to_grid(self.red_deposit_position)[0]
+            field = self.model.planner.column_field(column, self.yellow_threshold)
+            return self.follow_field(field)
+        return self.reach_location(*target)
 
     def can_release(self):
-        return self.knowledge["color_waste"][1, 1] == EMPTY
+        return self.knowledge.color_waste[1, 1] == EMPTY
 
     def release(self):
         return self.actions_dict[
-            "release_" + self.colors_ids[self.knowledge["carried"][0]]
+            "release_" + self.colors_ids[self.knowledge.carried]
         ]
 
     def pick(self):
@@ -876,127 +738,41 @@ class YellowAgent(RobotAgent):
                 return self.actions_dict["move_Down"]
 
     def reachable_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = [
-            [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-            for position in targets
-            if (position != self.yellow_deposit_position).any()
-        ]
-
-        if len(targets) == 0:
-            return None
-
-        prio1 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if self.knowledge["carried_by_others"][self.color_to_gather][pos]
-            == [self.color_to_gather]
-        ]
-
-        prio2 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio1, prio2 = [], []
-
-
-        x, y = self.get_pos()
-        if self.knowledge["carried"] == [self.color_to_gather]:
-            prio1.append((x, y))
-
-        elif len(self.knowledge["carried"]) == 0:
-            prio2.append((x, y))
-
-        attributions, targets = self.attribution(prio1, targets)
-        attributions, targets = self.attribution(prio2, targets, attributions)
-        return (x, y) in attributions
-
-    def attribution(self, positions, targets, attributions={}):
-        positions = np.array(positions)
-        targets = np.array(targets)
-        while len(positions) > 0 and len(targets) > 0:
-            mat = cdist(positions, targets)
-            min_id = np.argmin(mat)
-            i, j = np.unravel_index(min_id, mat.shape)
-            attributions[tuple(positions[i])] = tuple(targets[j])
-            positions = np.array(np.delete(positions, i, axis=0))
-            targets = np.array(np.delete(targets, j, axis=0))
-
-        return attributions, targets
+        return self.model.assignment.target(self) is not None
 
     def find_nearest_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = [
-            [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-            for position in targets
-            if (position != self.yellow_deposit_position).any()
-        ]
-
-        if len(targets) == 0:
-            return None
-
-        prio1 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if self.knowledge["carried_by_others"][self.color_to_gather][pos]
-            == [self.color_to_gather]
-        ]
-
-        prio2 = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio1, prio2 = [], []
-
-
-        x, y = self.get_pos()
-        if self.knowledge["carried"] == [self.color_to_gather]:
-            prio1.append((x, y))
-
-        elif len(self.knowledge["carried"]) == 0:
-            prio2.append((x, y))
-
-        attributions, targets = self.attribution(prio1, targets)
-        attributions, targets = self.attribution(prio2, targets, attributions)
-        if (x, y) in attributions:
-            return tuple(attributions[(x, y)])
-        else:
-            return None
+        return self.model.assignment.target(self)
 
     def reach_location(self, targetx, targety):
         possible_actions = []
         x, y = self.get_pos()
         if (
             targetx > x
-            and not self.knowledge["other_robots"][0, 1] == 1
+            and not self.knowledge.other_robots[0, 1] == 1
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
         elif (
             targetx < x
-            and not self.knowledge["other_robots"][2, 1] == 1
+            and not self.knowledge.other_robots[2, 1] == 1
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
         if (
             targety > y
-            and not self.knowledge["other_robots"][1, 2] == 1
+            and not self.knowledge.other_robots[1, 2] == 1
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
         elif (
             targety < y
-            and not self.knowledge["other_robots"][1, 0] == 1
+            and not self.knowledge.other_robots[1, 0] == 1
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if len(possible_actions) > 0:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
             return self.actions_dict[action]
         else:
             return self.random_walk()
@@ -1009,25 +785,6 @@ class YellowAgent(RobotAgent):
         return self.reach_location(targetx, targety)
 
     def deliberate(self):
-        if self.begin:
-            self.green_deposit_position = [
-                1,
-                (len(self.knowledge["grid"]) - 2)
-                - 2 * (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-
-            self.yellow_deposit_position = [
-                len(self.knowledge["grid"]) - 2,
-                (len(self.knowledge["grid"]) - 2)
-                - 2 * (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-            self.red_deposit_position = [
-                len(self.knowledge["grid"]) - 2,
-                (len(self.knowledge["grid"]) - 2)
-                - (len(self.knowledge["grid"]) - 2) // 3,
-            ]
-            self.begin = False
-
         if self.must_deliver():
             if self.red_deposit_not_available:
                 if (
@@ -1040,11 +797,12 @@ class YellowAgent(RobotAgent):
                 else:
                     return self.find_place_to_deliver()
 
-            elif self.is_on_red_deposit():
+            target = self.find_nearest_deposit()
+            if self.get_pos() == target:
                 return self.act_in_red_deposit()
 
             else:
-                return self.go_to_red_deposit()
+                return self.go_to_red_deposit(target)
 
         self.red_deposit_not_available = False
 
@@ -1064,9 +822,10 @@ class YellowAgent(RobotAgent):
 
 
 class RedAgent(RobotAgent):
+    color_to_gather = 2  # Can only gather red wastes
+
     def __init__(self, model, knowledge):
         super().__init__(model, knowledge)
-        self.color_to_gather = 2  # Can only gather red wastes
         self.random_walk_counter = (
             0  # Every 15 random_walk steps, the agent goes to the red waste deposit
         )
@@ -1076,30 +835,30 @@ class RedAgent(RobotAgent):
         possible_actions = []
 
         if (
-            self.knowledge["radioactivity"][1, 2] <= self.red_threshold
+            self.knowledge.radioactivity[1, 2] <= self.red_threshold
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
 
         if (
-            self.knowledge["radioactivity"][0, 1] <= self.red_threshold
+            self.knowledge.radioactivity[0, 1] <= self.red_threshold
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
 
         if (
-            self.knowledge["radioactivity"][1, 0] <= self.red_threshold
+            self.knowledge.radioactivity[1, 0] <= self.red_threshold
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if (
-            self.knowledge["radioactivity"][2, 1] <= self.red_threshold
+            self.knowledge.radioactivity[2, 1] <= self.red_threshold
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
 
-        action = random.choice(possible_actions)
+        action = self.random.choice(possible_actions)
         self.random_walk_counter += 1
         if self.random_walk_counter == 2 * self.grid_size:
             self.going_to_deposit = True
@@ -1113,197 +872,85 @@ class RedAgent(RobotAgent):
             return self.random_walk()
 
     def find_nearest_unexplored(self):
-        targets = np.argwhere(self.knowledge["grid"] == UNEXPLORED)
-        targets = np.array(
-            [
-                [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-                for position in targets
-            ]
-        )  # do not look for green waste in green deposit
-
-        if len(targets) == 0:
-            return None
-
-        x, y = self.get_pos()
-
-        distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
-        sorted_indices = np.lexsort(
-            (-targets[:, 1], -targets[:, 0], distances)
-        )  # en cas d'égalité des distances, le plus en haut à droite gagne
-        return tuple(targets[sorted_indices[0]])
-
-    def wall_map(self):
-        return self.knowledge["radioactivity"] == WALL
+        # en cas d'égalité des distances, le plus en haut à droite gagne
+        return self.frontier.nearest(self.get_pos(), prefer_right=True)
 
     def is_on_red_deposit(self):
         return (
-            (self.wall_map()[2, :]).all()
-            and (self.knowledge["radioactivity"][:2, 2] > self.yellow_threshold).all()
-            and (self.knowledge["radioactivity"][:, :2] <= self.yellow_threshold).all()
+            (self.border_map()[2, :]).all()
+            and (self.knowledge.radioactivity[:2, 2] > self.yellow_threshold).all()
+            and (self.knowledge.radioactivity[:, :2] <= self.yellow_threshold).all()
         )
 
     def is_on_waste_disposal(self):
-        return self.knowledge["is_waste_disposal"][1, 1]
+        return self.knowledge.is_waste_disposal[1, 1]
 
     def is_on_correct_waste(self):
-        return self.knowledge["color_waste"][1, 1] == self.color_to_gather
+        return self.knowledge.color_waste[1, 1] == self.color_to_gather
 
     def must_deliver(self):
-        return len(self.knowledge["carried"]) > 0
+        return self.knowledge.is_carrying()
 
     def go_to_waste_disposal(self):
-        possible_actions = []
-        if (
-            self.get_pos()[1] < len(self.knowledge["grid"]) - 3
-            and not self.knowledge["other_robots"][1, 2] == 1
-        ):
-            possible_actions.append("move_Right")
-
-        if (
-            self.get_pos()[0] < len(self.knowledge["grid"]) // 2
-            and not self.knowledge["other_robots"][0, 1] == 1
-        ):
-            possible_actions.append("move_Up")
-
-        elif not self.knowledge["other_robots"][2, 1] == 1:
-            possible_actions.append("move_Down")
-
-        if len(possible_actions) == 0:
-            return self.random_walk()
-
-        action = random.choice(possible_actions)
-        return self.actions_dict[action]
+        field = self.model.planner.disposal_field(self.red_threshold)
+        return self.follow_field(field)
 
     def go_to_red_deposit(self):
-        action = ""
-
-        if not self.wall_map()[2, 1] and not self.knowledge["other_robots"][2, 1] == 1:
-            action = "move_Down"
-
-        elif (
-            self.knowledge["radioactivity"][1, 2] <= self.yellow_threshold
-            and not self.wall_map()[1, 2]
-            and not self.knowledge["other_robots"][1, 2] == 1
-        ):
-            action = "move_Right"
-
-        elif (
-            self.knowledge["radioactivity"][1, 1] > self.yellow_threshold
-            and not self.knowledge["other_robots"][1, 0] == 1
-        ):
-            action = "move_Left"
-
-        if len(action) > 0:
-            return self.actions_dict[action]
-        else:
-            return self.random_walk()
+        # bottom of the last column of the yellow zone
+        red_deposit = (self.model.deposit_columns[1], 0)
+        field = self.model.planner.point_field(red_deposit, self.red_threshold)
+        return self.follow_field(field)
 
     def release(self):
         return self.actions_dict[
-            "release_" + self.colors_ids[self.knowledge["carried"][0]]
+            "release_" + self.colors_ids[self.knowledge.carried]
         ]
 
     def pick(self):
         return self.actions_dict["pick"]
 
-    def reachable_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = [
-            [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-            for position in targets
-        ]
-
-        if len(targets) == 0:
-            return None
-
-        prio = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio = []
-
-        x, y = self.get_pos()
-
-        if len(self.knowledge["carried"]) == 0:
-            prio.append((x, y))
-
-        attributions, targets = self.attribution(prio, targets)
-        return (x, y) in attributions
+    def assignment_class(self):
+        # red wastes can't be merged, only empty robots are looking for one
+        if not self.knowledge.is_carrying():
+            return 0
+        return None
 
-    def attribution(self, positions, targets, attributions={}):
-        positions = np.array(positions)
-        targets = np.array(targets)
-        while len(positions) > 0 and len(targets) > 0:
-            mat = cdist(positions, targets)
-            min_id = np.argmin(mat)
-            i, j = np.unravel_index(min_id, mat.shape)
-            attributions[tuple(positions[i])] = tuple(targets[j])
-            positions = np.array(np.delete(positions, i, axis=0))
-            targets = np.array(np.delete(targets, j, axis=0))
-
-        return attributions, targets
+    def reachable_waste(self):
+        return self.model.assignment.target(self) is not None
 
     def find_nearest_waste(self):
-        targets = np.argwhere(self.knowledge["grid"] == self.color_to_gather)
-        targets = [
-            [len(self.knowledge["grid"]) - position[0] - 1, position[1]]
-            for position in targets
-        ]
-
-        if len(targets) == 0:
-            return None
-
-        prio = [
-            pos
-            for pos in self.knowledge["carried_by_others"][self.color_to_gather]
-            if len(self.knowledge["carried_by_others"][self.color_to_gather][pos]) == 0
-        ]
-
-        prio = []
-
-        x, y = self.get_pos()
-
-        if len(self.knowledge["carried"]) == 0:
-            prio.append((x, y))
-
-        attributions, targets = self.attribution(prio, targets)
-        if (x, y) in attributions:
-            return tuple(attributions[(x, y)])
-        else:
-            return None
+        return self.model.assignment.target(self)
 
     def reach_location(self, targetx, targety):
         possible_actions = []
         x, y = self.get_pos()
         if (
             targetx > x
-            and not self.knowledge["other_robots"][0, 1] == 1
+            and not self.knowledge.other_robots[0, 1] == 1
             and not self.wall_map()[0, 1]
         ):
             possible_actions.append("move_Up")
         elif (
             targetx < x
-            and not self.knowledge["other_robots"][2, 1] == 1
+            and not self.knowledge.other_robots[2, 1] == 1
             and not self.wall_map()[2, 1]
         ):
             possible_actions.append("move_Down")
         if (
             targety > y
-            and not self.knowledge["other_robots"][1, 2] == 1
+            and not self.knowledge.other_robots[1, 2] == 1
             and not self.wall_map()[1, 2]
         ):
             possible_actions.append("move_Right")
         elif (
             targety < y
-            and not self.knowledge["other_robots"][1, 0] == 1
+            and not self.knowledge.other_robots[1, 0] == 1
             and not self.wall_map()[1, 0]
         ):
             possible_actions.append("move_Left")
 
         if len(possible_actions) > 0:
-            action = random.choice(possible_actions)
+            action = self.random.choice(possible_actions)
             return self.actions_dict[action]
         else:
             return self.random_walk()
@@ -0,0 +1,99 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from knowledge import EMPTY
+
+
+class AssignmentEngine:
+    """Assignment of the known wastes of a color to the robots gathering this color.
+
+    The wastes known by the robots are kept incrementally: after each action, a robot gives the
+    cells it observes to observe (the ones it publishes on the blackboard, including the wastes
+    it just picked or dropped), and the engine updates the set of known wastes of each color.
+    Once per step and per team, the first robot asking for a target triggers a minimum cost
+    matching between the robots of its team and these wastes, using the Manhattan distance on
+    the grid. Robots are matched by priority class (see RobotAgent.assignment_class): robots
+    already carrying a waste of their color first, so that they can merge it right away, then
+    empty robots on the remaining wastes. The result is cached and shared by every robot of
+    the team for the rest of the step, unless one of its targets is taken in the meantime.
+
+    attr:
+        size: side of the knowledge grids, cells are flat indices in them
+        colors: color of the waste last seen on each cell, EMPTY if none
+        known: for each color, the cells where a waste of this color was last seen
+        excluded: for each color, the cells whose wastes aren't targets (the deposit where
+            the team drops the wastes it merged)
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.size = model.grid_size + 2
+        self.colors = np.full(self.size * self.size, EMPTY, dtype=np.int8)
+        self.known = [set(), set(), set()]
+        green_column = model.deposit_columns[0]
+        self.excluded = [
+            {self.size + green_column + 1},
+            {model.grid_size * self.size + green_column + 1},
+            set(),
+        ]
+        self.__assignments = {}  # color -> (step, {robot id: target}, target cells)
+
+    def observe(self, cells, values):
+        """Record the waste colors (values) seen on cells (flat indices of the knowledge grid)."""
+        previous = self.colors[cells]
+        changed = previous != values
+        if not changed.any():
+            return
+        cells, values, previous = cells[changed], values[changed], previous[changed]
+        self.colors[cells] = values
+        for color, known in enumerate(self.known):
+            taken = cells[previous == color].tolist()
+            if len(taken) > 0:
+                known.difference_update(taken)
+                cached = self.__assignments.get(color)
+                if cached is not None and not cached[2].isdisjoint(taken):
+                    del self.__assignments[color]
+            known.update(cells[values == color].tolist())
+
+    def target(self, robot):
+        """Return the waste (get_pos coordinates) assigned to the robot, or None."""
+        color = robot.color_to_gather
+        cached = self.__assignments.get(color)
+        if cached is None or cached[0] != self.model.steps:
+            assignments = self.assign(self.team(robot), self.known_wastes(color))
+            cells = {(self.size - 1 - x) * self.size + y for x, y in assignments.values()}
+            cached = (self.model.steps, assignments, cells)
+            self.__assignments[color] = cached
+        return cached[1].get(robot.unique_id)
+
+    def known_wastes(self, color):
+        """Return the positions (get_pos coordinates) of the known wastes of a color."""
+        cells = np.array(sorted(self.known[color] - self.excluded[color]), dtype=np.int64)
+        rows, columns = np.divmod(cells, self.size)
+        return np.stack([self.size - 1 - rows, columns], axis=1)
+
+    def team(self, robot):
+        """Return the robots gathering the same color as robot."""
+        return self.model.robots_by_color[robot.color_to_gather]
+
+    @staticmethod
+    def assign(robots, targets):
+        """Match robots to targets class by class, minimising the total Manhattan distance."""
+        assignments = {}
+        targets = np.asarray(targets, dtype=np.int64).reshape(-1, 2)
+        classes = {}
+        for robot in robots:
+            priority = robot.assignment_class()
+            if priority is not None:
+                classes.setdefault(priority, []).append(robot)
+        for priority in sorted(classes):
+            if len(targets) == 0:
+                break
+            team = classes[priority]
+            positions = np.array([robot.get_pos() for robot in team])
+            costs = np.abs(positions[:, None, :] - targets[None, :, :]).sum(axis=2)
+            robot_ids, target_ids = linear_sum_assignment(costs)
+            for i, j in zip(robot_ids, target_ids):
+                assignments[team[i].unique_id] = tuple(int(v) for v in targets[j])
+            targets = np.delete(targets, target_ids, axis=0)
+        return assignments
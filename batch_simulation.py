@@ -1,76 +1,186 @@
 import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
 
 import matplotlib.pyplot as plt
 import numpy as np
 import tqdm
 import yaml
 
-from agents import (
-    GreenAgent,
-    RandomGreenAgent,
-    RandomRedAgent,
-    RandomYellowAgent,
-    RedAgent,
-    YellowAgent,
-)
-from env import Waste
-from message.MessageService import MessageService
+from layout import ZoneLayout
+from env import STEP_POLICIES
 from model import RobotMission
+from multi_mission import MultiMission
+from recorder import SimulationRecorder
+from simulation_cache import SimulationCache
+from stop_conditions import StopConditions
 
 
-def run_batch_simu(num_simulations, random_agents, steps):
-    mean_waste_counts = {"green": [], "yellow": [], "red": []}
+def fleet(config):
+    """Return the number of robots and of wastes of each color of a config."""
+    colors = ["green", "yellow", "red"]
+    n_agents = {color: config[color + "_robots"] for color in colors}
+    n_wastes = {color: config[color + "_wastes"] for color in colors}
+    return n_agents, n_wastes
+
+
+def run_simulation(
+    config,
+    random_agents,
+    steps,
+    seed,
+    waste_counts=None,
+    step_policy=None,
+    stop=None,
+):
+    """Run a single simulation and return its (3, steps) waste counts.
+
+    With a step_policy (random agents only), the actions of the random robots are sampled at
+    the beginning of the step and applied in a single call to Environment.step_batch.
+    """
+    n_agents, n_wastes = fleet(config)
+    model = RobotMission(
+        n_agents=n_agents,
+        n_wastes=n_wastes,
+        grid_size=config["grid_size"],
+        use_random_agents=random_agents,
+        seed=seed,
+        step_policy=step_policy,
+        layout=ZoneLayout.from_config(config),
+    )
+    # Each model creates its own message service, use this one and not the last singleton
+    model.get_messages_service().set_instant_delivery(True)
+    return visualize_simulation(
+        model,
+        steps=steps,
+        use_random_agents=random_agents,
+        waste_counts=waste_counts,
+        stop=stop,
+    )
+
+
+def run_batch_simu(
+    num_simulations,
+    random_agents,
+    steps,
+    workers=1,
+    seed=0,
+    cache=None,
+    path=None,
+    step_policy=None,
+    stop=None,
+    lockstep=False,
+):
+    """Run num_simulations simulations with the seeds seed, seed + 1, ...
+    and return a SimulationRecorder holding their waste counts.
+
+    With workers > 1 the simulations are spread over a pool of processes, the results are
+    still returned in the order of the seeds and are the same as with a serial run.
+    With a SimulationCache, the runs already cached are reused and only the missing seeds
+    are simulated. With a path, the results are stored in a memory-mapped file.
+    With a step_policy ("sequential" or "simultaneous", random agents only), the actions of
+    the robots are sampled at once and applied with Environment.step_batch.
+    With StopConditions, each simulation stops as soon as one of them holds (see
+    visualize_simulation). Runs stopped by a time budget depend on the machine, so the cache
+    is not used with one.
+    With lockstep (random agents with the simultaneous step policy, in a single process), the
+    missing simulations run together in a MultiMission (multi_mission.py), giving the same runs
+    as a serial run.
+    """
+    if lockstep and (not random_agents or step_policy != "simultaneous"):
+        raise ValueError("lockstep needs random agents with the simultaneous step policy")
+    if lockstep and workers > 1:
+        raise ValueError("lockstep runs the simulations in a single process, use workers=1")
     with open("configs/batch_config.yaml", "r") as f:
         config = yaml.safe_load(f)
-    for _ in tqdm.tqdm(range(num_simulations)):
-        model = RobotMission(
-            n_agents={
-                "green": config["green_robots"],
-                "yellow": config["yellow_robots"],
-                "red": config["red_robots"],
-            },
-            n_wastes={
-                "green": config["green_wastes"],
-                "yellow": config["yellow_wastes"],
-                "red": config["red_wastes"],
-            },
-            grid_size=config["grid_size"],
-            use_random_agents=random_agents,
+    seeds = [seed + i for i in range(num_simulations)]
+    policy = "random" if random_agents else "heuristic"
+    if step_policy is not None:
+        policy += "-" + step_policy
+    recorder = SimulationRecorder(
+        num_simulations,
+        steps,
+        path=path,
+        metadata={"config": config, "policy": policy, "seeds": seeds},
+    )
+    missing = []
+    if stop is not None and stop.time_budget is not None:
+        cache = None
+    if cache is not None:
+        description = None if stop is None else stop.description()
+        keys = [cache.key(config, policy, seed, steps, description) for seed in seeds]
+    for i in range(num_simulations):
+        waste_counts = cache.get(keys[i]) if cache is not None else None
+        if waste_counts is not None:
+            recorder.record_run(i, waste_counts)
+        else:
+            missing.append(i)
+    if lockstep and len(missing) > 0:
+        n_agents, n_wastes = fleet(config)
+        multi = MultiMission(
+            [seeds[i] for i in missing],
+            n_agents,
+            n_wastes,
+            config["grid_size"],
+            layout=ZoneLayout.from_config(config),
         )
-        MessageService.get_instance().set_instant_delivery(True)
-        waste_counts = visualize_simulation(
-            model, steps=steps, use_random_agents=random_agents
+        for mission in multi.missions:
+            mission.get_messages_service().set_instant_delivery(True)
+        counts = multi.run(steps, stop=stop)
+        for k, i in enumerate(missing):
+            recorder.record_run(i, counts[:, k])
+    elif workers > 1 and len(missing) > 1:
+        simulate = functools.partial(
+            run_simulation,
+            config,
+            random_agents,
+            steps,
+            step_policy=step_policy,
+            stop=stop,
         )
-        for color in waste_counts:
-            mean_waste_counts[color].append(waste_counts[color])
-    return mean_waste_counts
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(simulate, [seeds[i] for i in missing])
+            for i, waste_counts in zip(missing, tqdm.tqdm(results, total=len(missing))):
+                recorder.record_run(i, waste_counts)
+    else:
+        for i in tqdm.tqdm(missing):
+            # the simulation streams its counts directly into the recorder
+            run_simulation(
+                config,
+                random_agents,
+                steps,
+                seeds[i],
+                waste_counts=recorder.run(i),
+                step_policy=step_policy,
+                stop=stop,
+            )
+    if cache is not None:
+        for i in missing:
+            cache.put(keys[i], recorder.run(i))
+    recorder.flush()
+    return recorder
 
 
-def visualize_simulation(model, steps, use_random_agents):
-    waste_counts = {"green": [], "yellow": [], "red": []}
-    if use_random_agents:
-        greenagentclass = RandomGreenAgent
-        yellowagentclass = RandomYellowAgent
-        redagentclass = RandomRedAgent
-    else:
-        greenagentclass = GreenAgent
-        yellowagentclass = YellowAgent
-        redagentclass = RedAgent
+def visualize_simulation(model, steps, use_random_agents, waste_counts=None, stop=None):
+    """Run the model for steps steps and write the waste counts of each color in a
+    (3, steps) array, allocated if waste_counts is not given.
+
+    With StopConditions, the run ends as soon as one of them holds: model.running is cleared
+    and the counts of the remaining steps are the ones of the last step. Once every waste is
+    disposed of the counts can't change any more, so stopping on all_disposed gives the same
+    counts, hence the same AUC and first step cleared, as a full run.
+    """
+    if waste_counts is None:
+        waste_counts = np.zeros((3, steps), dtype=np.int32)
+    if stop is not None:
+        stop.reset(model)
     for step in range(steps):
         model.step()
-        green_count, yellow_count, red_count = 0, 0, 0
-        for agent in model.agents:
-            if isinstance(agent, Waste) and agent.pos is not None:
-                color = ["green", "yellow", "red"][agent.color_waste]
-                if color == "green":
-                    green_count += 1
-                elif color == "yellow":
-                    yellow_count += 1
-                else:
-                    red_count += 1
-        waste_counts["green"].append(green_count)
-        waste_counts["yellow"].append(yellow_count)
-        waste_counts["red"].append(red_count)
+        waste_counts[:, step] = model.world.waste_counts
+        if stop is not None and stop.check(model, step) is not None:
+            waste_counts[:, step + 1 :] = waste_counts[:, step, None]
+            model.running = False
+            break
     return waste_counts
 
 
@@ -88,17 +198,104 @@ if __name__ == "__main__":
     argparser.add_argument(
         "--do_random", action="store_true", help="Use random agents", default=False
     )
-    args = argparser.parse_args()
-    mean_waste_counts = run_batch_simu(
-        num_simulations=args.n_sim, random_agents=args.do_random, steps=args.steps
+    argparser.add_argument(
+        "--step_policy",
+        choices=STEP_POLICIES,
+        default=None,
+        help="Sample the actions of the random robots at once and apply them with this policy",
+    )
+    argparser.add_argument(
+        "--full_run",
+        action="store_true",
+        help="Keep simulating after every waste is disposed of",
+        default=False,
+    )
+    argparser.add_argument(
+        "--patience",
+        type=int,
+        default=None,
+        help="Stop a simulation when no waste moved during this number of steps",
+    )
+    argparser.add_argument(
+        "--time_budget",
+        type=float,
+        default=None,
+        help="Stop a simulation after this number of seconds",
     )
-    waste_counts_green = mean_waste_counts["green"]
-    waste_counts_yellow = mean_waste_counts["yellow"]
-    waste_counts_red = mean_waste_counts["red"]
+    argparser.add_argument(
+        "--lockstep",
+        action="store_true",
+        help="Run the simulations together in a MultiMission (random agents with the "
+        "simultaneous step policy, single process)",
+        default=False,
+    )
+    argparser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes running the simulations in parallel",
+    )
+    argparser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the first simulation"
+    )
+    argparser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=".simulation_cache",
+        help="Folder where the results of the simulations are cached",
+    )
+    argparser.add_argument(
+        "--cache_size",
+        type=int,
+        default=512,
+        help="Maximum size of the cache in MB, the least recently used runs are deleted beyond",
+    )
+    argparser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Simulate every run without reading or writing the cache",
+        default=False,
+    )
+    argparser.add_argument(
+        "--record",
+        type=str,
+        default=None,
+        help="Store the waste counts in this memory-mapped .npy file",
+    )
+    argparser.add_argument(
+        "--load",
+        type=str,
+        default=None,
+        help="Plot the results recorded in this .npy file instead of running simulations",
+    )
+    args = argparser.parse_args()
+    if args.load is not None:
+        recorder = SimulationRecorder.load(args.load)
+    else:
+        cache = None
+        if not args.no_cache:
+            cache = SimulationCache(args.cache_dir, max_bytes=args.cache_size * 2**20)
+        recorder = run_batch_simu(
+            num_simulations=args.n_sim,
+            random_agents=args.do_random,
+            steps=args.steps,
+            workers=args.workers,
+            seed=args.seed,
+            cache=cache,
+            path=args.record,
+            step_policy=args.step_policy,
+            lockstep=args.lockstep,
+            stop=StopConditions(
+                all_disposed=not args.full_run,
+                patience=args.patience,
+                time_budget=args.time_budget,
+            ),
+        )
+    steps = recorder.steps
 
-    mean_waste_counts_green = np.mean(waste_counts_green, axis=0)
-    mean_waste_counts_yellow = np.mean(waste_counts_yellow, axis=0)
-    mean_waste_counts_red = np.mean(waste_counts_red, axis=0)
+    mean_waste_counts_green = recorder.mean_curve("green")
+    mean_waste_counts_yellow = recorder.mean_curve("yellow")
+    mean_waste_counts_red = recorder.mean_curve("red")
 
     plt.plot(
         range(len(mean_waste_counts_green)),
@@ -122,23 +319,23 @@ if __name__ == "__main__":
     # Compute the AUC for each color
     if np.__version__ >= "2.0.0":
         auc_green = np.trapezoid(mean_waste_counts_green, dx=1) / (
-            args.steps * mean_waste_counts_green[0]
+            steps * mean_waste_counts_green[0]
         )
         auc_yellow = np.trapezoid(mean_waste_counts_yellow, dx=1) / (
-            args.steps * mean_waste_counts_yellow[0]
+            steps * mean_waste_counts_yellow[0]
         )
         auc_red = np.trapezoid(mean_waste_counts_red, dx=1) / (
-            args.steps * mean_waste_counts_red[0]
+            steps * mean_waste_counts_red[0]
         )
     else:
         auc_green = np.trapz(mean_waste_counts_green, dx=1) / (
-            args.steps * mean_waste_counts_green[0]
+            steps * mean_waste_counts_green[0]
         )
         auc_yellow = np.trapz(mean_waste_counts_yellow, dx=1) / (
-            args.steps * mean_waste_counts_yellow[0]
+            steps * mean_waste_counts_yellow[0]
         )
         auc_red = np.trapz(mean_waste_counts_red, dx=1) / (
-            args.steps * mean_waste_counts_red[0]
+            steps * mean_waste_counts_red[0]
         )
     max_wastes = max(
         mean_waste_counts_green[0],
@@ -148,7 +345,7 @@ if __name__ == "__main__":
     plt.xlabel("Step")
     plt.ylabel("Waste Count")
     plt.text(
-        args.steps / 2,
+        steps / 2,
         max_wastes - 2,
         f"Score green: {1 - auc_green:.2f}\nScore yellow: {1 - auc_yellow:.2f}\nScore red: {1 - auc_red:.2f}\nGlobal Score : {1 -(auc_green + auc_yellow + auc_red)/3:.2f}",
     )
@@ -167,7 +364,7 @@ if __name__ == "__main__":
     if first_step_red >= len(mean_waste_counts_red):
         first_step_red = "Not cleared"
     plt.text(
-        args.steps / 2,
+        steps / 2,
         max_wastes - 4,
         f"First step green: {first_step_green}\nFirst step yellow: {first_step_yellow}\nFirst step red: {first_step_red}",
     )
@@ -0,0 +1,93 @@
+import numpy as np
+
+from knowledge import EMPTY
+
+PICK = 0
+NOTHING = 8
+# The four moves, in the order of the columns of the move masks:
+# cell of the 3*3 observation reached and action
+MOVE_CELLS = (np.array([0, 1, 2, 1]), np.array([1, 2, 1, 0]))
+MOVE_ACTIONS = np.array([4, 5, 6, 7])
+
+
+def draw(uniforms, choices):
+    """Draw uniformly one of the True columns of each row of a boolean array, from one uniform
+    number in [0, 1) per row.
+
+    Return the drawn columns and whether each row had at least one True column.
+    """
+    counts = choices.sum(axis=1)
+    draws = np.floor(uniforms * counts)
+    return np.argmax(choices.cumsum(axis=1) > draws[:, None], axis=1), counts > 0
+
+
+class RandomPolicy:
+    """Random policy of the random robots of the mission, sampled for all of them at once.
+
+    A random robot picks a waste of its color when it can, releases its waste on the waste
+    disposal zone, and otherwise draws uniformly among releasing its waste on a green waste
+    and the moves towards the cells it can stand, as RandomGreenAgent, RandomYellowAgent and
+    RandomRedAgent do. These rules only depend on the knowledge of the robot, so the actions
+    of every robot are sampled at the beginning of the step from the arrays of their
+    observations, with the model generator.
+
+    attr:
+        robots: the random robots of the mission
+        colors: color gathered by each robot
+        thresholds: highest radioactivity each robot can stand
+    """
+
+    def __init__(self, model, robots):
+        self.model = model
+        self.robots = list(robots)
+        self.colors = np.array([robot.color_to_gather for robot in self.robots])
+        self.thresholds = np.array([robot.threshold for robot in self.robots])
+        # red wastes can't be merged, red robots only pick a waste when they carry nothing
+        self.can_merge = self.colors != 2
+
+    def plan(self):
+        """Sample the action of every robot, returned in the order of robots."""
+        if len(self.robots) == 0:
+            return np.zeros(0, dtype=int)
+        knowledges = [robot.knowledge for robot in self.robots]
+        return sample_actions(
+            knowledges,
+            self.colors,
+            self.thresholds,
+            self.can_merge,
+            self.model.rng.random(len(self.robots)),
+        )
+
+
+def sample_actions(knowledges, colors, thresholds, can_merge, uniforms):
+    """Sample the actions of random robots (see RandomPolicy) from their knowledges, the
+    color they gather, their threshold, whether they can merge wastes and one uniform number
+    in [0, 1) per robot.
+    """
+    carried = np.array([knowledge.carried for knowledge in knowledges])
+    on_waste = np.array([knowledge.color_waste[1, 1] for knowledge in knowledges])
+    on_disposal = np.array(
+        [knowledge.is_waste_disposal[1, 1] for knowledge in knowledges]
+    )
+    radioactivity = np.array([knowledge.radioactivity for knowledge in knowledges])
+    radioactivity = radioactivity[:, MOVE_CELLS[0], MOVE_CELLS[1]]
+    walls = np.array([knowledge.is_wall for knowledge in knowledges])
+    walls = walls[:, MOVE_CELLS[0], MOVE_CELLS[1]] == 1
+    carrying = carried != EMPTY
+
+    # the first choice is the release of the carried waste, then come the four moves
+    choices = np.column_stack(
+        [
+            carrying & (on_waste == 0),
+            (radioactivity >= 0) & (radioactivity <= thresholds[:, None]) & ~walls,
+        ]
+    )
+    chosen, can_act = draw(uniforms, choices)
+    actions = np.where(
+        chosen == 0, 1 + carried, MOVE_ACTIONS[np.maximum(chosen - 1, 0)]
+    )
+    actions[~can_act] = NOTHING
+    actions[carrying & (on_disposal == 1)] = 1 + carried[carrying & (on_disposal == 1)]
+    pick = (on_waste == colors) & (~carrying | (can_merge & (carried == colors)))
+    actions[pick] = PICK
+    return actions
@@ -0,0 +1,75 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from world import EMPTY
+
+
+class DepositSlots:
+    """Free cells of a deposit column, shared by the robots dropping their wastes on it.
+
+    The mesa rows of the free cells (without waste nor wall) are kept sorted and updated by the
+    world each time the wastes of a cell change, so the nearest free cell is found with a binary
+    search instead of scanning the knowledge grid of the robot. When the deposit column is full, the robots drop
+    their wastes on the nearest column on its left with a free cell: the free rows of these
+    overflow columns are indexed the same way, the first time the deposit overflows on them.
+    Positions are given and returned in the robot coordinates of RobotAgent.get_pos
+    (x = mesa y + 1, y = mesa x + 1).
+
+    attr:
+        column: the deposit column
+        excluded: rows of the deposit column where the wastes can't be dropped
+        free: for the deposit column and each indexed overflow column, the sorted free rows
+    """
+
+    def __init__(self, world, column, excluded=()):
+        self.world = world
+        self.column = column
+        self.excluded = set(excluded)
+        self.free = {}
+        self.__index(column)
+        world.add_waste_listener(self.update)
+
+    def __len__(self):
+        return len(self.free[self.column])
+
+    def __index(self, column):
+        world = self.world
+        free = (world.waste_color[column] == EMPTY) & (world.is_wall[column] == 0)
+        rows = np.flatnonzero(free).tolist()
+        if column == self.column:
+            rows = [y for y in rows if y not in self.excluded]
+        self.free[column] = rows
+
+    def update(self, pos):
+        """Follow a change of the wastes lying on pos."""
+        x, y = pos
+        free = self.free.get(x)
+        if free is None or (x == self.column and y in self.excluded):
+            return
+        index = bisect_left(free, y)
+        is_listed = index < len(free) and free[index] == y
+        if self.world.waste_color[pos] == EMPTY and self.world.is_wall[pos] == 0:
+            if not is_listed:
+                insort(free, y)
+        elif is_listed:
+            del free[index]
+
+    def nearest(self, pos):
+        """Return the nearest free cell of the deposit column to pos or, when it is full, of the
+        nearest overflow column on its left, or None if every column up to the left border
+        is full.
+
+        Ties are broken in favour of the upper cell.
+        """
+        y = pos[0] - 1
+        for column in range(self.column, -1, -1):
+            if column not in self.free:
+                self.__index(column)
+            free = self.free[column]
+            if len(free) > 0:
+                index = bisect_left(free, y)
+                candidates = [free[i] for i in (index, index - 1) if 0 <= i < len(free)]
+                best = min(candidates, key=lambda row: (abs(row - y), -row))
+                return (best + 1, column + 1)
+        return None
@@ -1,8 +1,7 @@
 import numpy as np
-from mesa import Agent, Model
-from mesa.space import MultiGrid
 
-from agents import RobotAgent
+from observation_cache import ObservationCache
+from world import CHANNELS, COLOR_WASTE, WorldState
 
 ACTIONS_DICT = {
     0: "pick",
@@ -14,57 +13,39 @@ ACTIONS_DICT = {
     6: "move_down",
     7: "move_left",
 }
-
-
-class Waste(Agent):
-    def __init__(self, model: Model, color_waste=0):
-        super().__init__(model)
-        self.color_waste = color_waste
-
-
-class Radioactivity(Agent):
-    def __init__(self, model, radioactivity_level=0, is_waste_disposal=0, is_wall=0):
-        super().__init__(model)
-        self.radioactivity_level = radioactivity_level
-        self.is_waste_disposal = is_waste_disposal
-        self.is_wall = is_wall
+# Offset on the grid of the moves 4 to 7
+MOVE_OFFSETS = np.array([[0, 1], [1, 0], [0, -1], [-1, 0]])
+STEP_POLICIES = ["sequential", "simultaneous"]
 
 
 class Environment:
-    def __init__(self, model, grid: MultiGrid):
+    def __init__(self, model, world: WorldState, cache_observations=False):
         self.model = model
-        self.grid = grid
-        self.width = grid.width
-        self.height = grid.height
+        self.world = world
+        self.width = world.width
+        self.height = world.height
+        # ObservationCache of the neighbourhoods, None to read them from the world
+        self.observations = ObservationCache(world) if cache_observations else None
 
     def step(self, agent, action):
         # called in model.do
         # desired output is [radioactivity_level 3*3, color_waste 3*3, is_waste_disposal 3*3, is_wall 3*3, other_robots 3*3, success]
+        return self.get_info(self.apply(agent, action))
+
+    def apply(self, agent, action):
+        """Apply the action of a robot and return its new position."""
         pos = agent.pos
-        cell_agent = self.grid.get_cell_list_contents(
-            pos
-        )  # get agents at the same pos as the robot (Waste+Radioactivity)
-        # neighbours = self.grid.get_neighborhood(pos, moore=True, include_center=False)
-        observation = self.get_info(pos)
-        success = observation["success"]
+        success = self.can_pickup(pos)
         # Update the cell according to the action
         position_moved = None
         if action != 8:
             if action == 0 and success:
-                for agent in cell_agent:
-                    if isinstance(agent, Waste):
-                        self.grid.remove_agent(agent)
+                self.world.remove_wastes(pos)
             if action in [1, 2, 3]:
-                for agent in cell_agent:
-                    if isinstance(agent, Radioactivity):
-                        is_waste_disposal = agent.is_waste_disposal
-                if is_waste_disposal == 0:
-                    waste_agent = Waste(self.model, color_waste=action - 1)
-                    self.grid.place_agent(waste_agent, pos)
+                if self.world.is_waste_disposal[pos] == 0:
+                    self.world.add_waste(pos, action - 1)
                 else:
-                    for agent in cell_agent:
-                        if isinstance(agent, Waste):
-                            self.grid.remove_agent(agent)
+                    self.world.remove_wastes(pos)
             elif action in [4, 5, 6, 7]:
                 if action == 4:  # up
                     new_position = (pos[0], pos[1] + 1)
@@ -74,67 +55,118 @@ class Environment:
                     new_position = (pos[0], pos[1] - 1)
                 elif action == 7:  # left
                     new_position = (pos[0] - 1, pos[1])
-                agent_newpos = self.grid.get_cell_list_contents(new_position)
-                agent_already_here = False
-                for agent_new in agent_newpos:
-                    if isinstance(agent_new, RobotAgent):
-                        agent_already_here = True
                 if (
-                    0 <= new_position[0] < self.width
-                    and 0 <= new_position[1] < self.height
-                ) and not agent_already_here:
-                    self.grid.move_agent(agent, new_position)
+                    self.world.in_bounds(new_position)
+                    and self.world.is_wall[new_position] == 0
+                    and self.world.robots[new_position] == 0
+                ):
+                    self.world.move_robot(pos, new_position)
+                    agent.pos = new_position
                     position_moved = new_position
         if position_moved is None:
             position_moved = pos
-        new_observation = self.get_info(position_moved)
-        return new_observation
+        return position_moved
+
+    def step_batch(self, agents, actions, policy="sequential"):
+        """Apply the actions of several robots and return their stacked observations
+        (shape n * 5 * 3 * 3) and pickup successes, as get_info_batch.
+
+        With the sequential policy, the actions are applied one after the other in the order of
+        agents and each robot observes the grid right after its own action, exactly as
+        successive calls to step. With the simultaneous policy, every action is applied to the
+        grid as it was at the beginning of the tick: a move succeeds if its cell is inside the
+        grid, isn't a wall, was free at the beginning of the tick and isn't the cell of an
+        earlier move of agents. Every robot then observes the grid after all the actions.
+        With both policies, the neighbourhoods are read through the ObservationCache if any.
+        """
+        if policy not in STEP_POLICIES:
+            raise ValueError(
+                "Unknown step policy " + str(policy) + ", expected one of " + str(STEP_POLICIES)
+            )
+        if policy == "sequential":
+            neighbourhoods = np.empty((len(agents), len(CHANNELS), 3, 3))
+            success = np.empty(len(agents), dtype=bool)
+            for k, (agent, action) in enumerate(zip(agents, actions)):
+                pos = self.apply(agent, action)
+                neighbourhoods[k] = self.neighbourhood(pos)
+                success[k] = self.can_pickup(pos)
+            return neighbourhoods, success
+
+        positions = np.array([agent.pos for agent in agents], dtype=np.intp).reshape(-1, 2)
+        actions = np.asarray(actions)
+        can_pickup = self.world.robots[positions[:, 0], positions[:, 1]] <= 1
+        for k in np.flatnonzero((actions == 0) & can_pickup):
+            self.world.remove_wastes(tuple(positions[k].tolist()))
+        for k in np.flatnonzero((actions >= 1) & (actions <= 3)):
+            pos = tuple(positions[k].tolist())
+            if self.world.is_waste_disposal[pos] == 0:
+                self.world.add_waste(pos, int(actions[k]) - 1)
+            else:
+                self.world.remove_wastes(pos)
+
+        moving = np.flatnonzero((actions >= 4) & (actions <= 7))
+        targets = positions[moving] + MOVE_OFFSETS[actions[moving] - 4]
+        inside = (
+            (targets[:, 0] >= 0)
+            & (targets[:, 0] < self.world.width)
+            & (targets[:, 1] >= 0)
+            & (targets[:, 1] < self.world.height)
+        )
+        moving, targets = moving[inside], targets[inside]
+        free = (self.world.is_wall[targets[:, 0], targets[:, 1]] == 0) & (
+            self.world.robots[targets[:, 0], targets[:, 1]] == 0
+        )
+        moving, targets = moving[free], targets[free]
+        # when several robots move to the same cell, the first one in agents gets it
+        _, first = np.unique(
+            targets[:, 0] * self.world.height + targets[:, 1], return_index=True
+        )
+        for k, target in zip(moving[first], targets[first].tolist()):
+            agent = agents[k]
+            new_position = tuple(target)
+            self.world.move_robot(agent.pos, new_position)
+            agent.pos = new_position
+            positions[k] = new_position
+        if self.observations is None:
+            return self.get_info_batch(positions)
+        # read through the cache, whose entries around the changed cells were dropped above
+        cells = [tuple(pos) for pos in positions.tolist()]
+        neighbourhoods = np.empty((len(cells), len(CHANNELS), 3, 3))
+        for k, pos in enumerate(cells):
+            neighbourhoods[k] = self.observations.neighbourhood(pos)
+        return neighbourhoods, self.world.robots[positions[:, 0], positions[:, 1]] <= 1
 
     def get_info(self, pos):
-        # Get information from neighbouts
-        radioactivity_level = np.zeros((3, 3)) - 1
-        color_waste = np.zeros((3, 3)) - 1
-        is_waste_disposal = np.zeros((3, 3)) - 1
-        is_wall = np.zeros((3, 3))
-        other_robots = np.zeros((3, 3))
-        neighbours = self.grid.get_neighborhood(pos, moore=True, include_center=True)
-        success = self.can_pickup(pos)
-        for i, neighbour in enumerate(neighbours):
-            neighbour_agent = self.grid.get_cell_list_contents(neighbour)
-            if len(neighbour_agent) == 0:
-                raise ValueError
-            waste_agent, radioactivity_agent, robot_agent = None, None, None
-            for agent in neighbour_agent:
-                if isinstance(agent, Waste):
-                    waste_agent = agent
-                elif isinstance(agent, Radioactivity):
-                    radioactivity_agent = agent
-                elif isinstance(agent, RobotAgent):
-                    robot_agent = agent
-            # compute position in the 3*3 matrix while considering edges
-            x_neigh, y_neigh = neighbour
-            x = (x_neigh - pos[0] + 1) % 3
-            y = (y_neigh - pos[1] + 1) % 3
-            radioactivity_level[x][y] = radioactivity_agent.radioactivity_level
-            is_waste_disposal[x][y] = radioactivity_agent.is_waste_disposal
-            is_wall[x][y] = radioactivity_agent.is_wall
-            if waste_agent is not None:
-                color_waste[x][y] = waste_agent.color_waste
-            if robot_agent is not None:
-                other_robots[x][y] = 1
-        color_waste = np.rot90(color_waste.astype(int))
-        radioactivity_level = np.rot90(radioactivity_level)
-        is_waste_disposal = np.rot90(is_waste_disposal)
-        is_wall = np.rot90(is_wall)
-        other_robots = np.rot90(other_robots)
-        observation = {
-            "radioactivity": radioactivity_level,
-            "color_waste": color_waste,
-            "is_waste_disposal": is_waste_disposal,
-            "is_wall": is_wall,
-            "other_robots": other_robots,
-            "success": success,
-        }
+        # Get information from neighbours
+        return self.to_observation(self.neighbourhood(pos), self.can_pickup(pos))
+
+    def neighbourhood(self, pos):
+        """Return the 3*3 neighbourhood of pos for every channel (shape 5 * 3 * 3)."""
+        if self.observations is None:
+            return self.world.neighbourhood(pos)
+        return self.observations.neighbourhood(pos)
+
+    def get_info_batch(self, positions):
+        """Return the stacked neighbourhoods (shape n * 5 * 3 * 3) and pickup successes of several positions."""
+        positions = np.asarray(positions, dtype=np.intp).reshape(-1, 2)
+        neighbourhoods = self.world.neighbourhoods(positions)
+        success = self.world.robots[positions[:, 0], positions[:, 1]] <= 1
+        return neighbourhoods, success
+
+    def get_infos(self, agents):
+        """Return the observation of every agent given, computed in a single pass."""
+        neighbourhoods, success = self.get_info_batch([agent.pos for agent in agents])
+        return [
+            self.to_observation(neighbourhood, bool(can_pickup))
+            for neighbourhood, can_pickup in zip(neighbourhoods, success)
+        ]
+
+    @staticmethod
+    def to_observation(neighbourhood, success):
+        """Split a 5 * 3 * 3 neighbourhood into the observation dict given to the robots."""
+        observation = dict(zip(CHANNELS, neighbourhood))
+        observation["color_waste"] = neighbourhood[COLOR_WASTE].astype(int)
+        observation["success"] = success
         return observation
 
     def reset(self):
@@ -142,11 +174,13 @@ class Environment:
 
     def can_pickup(self, pos):
         # check if there is not another robot here
-        cell_agent = self.grid.get_cell_list_contents(pos)
-        count_agent = 0
-        for agent in cell_agent:
-            if isinstance(agent, RobotAgent):
-                count_agent += 1
-        if count_agent > 1:
-            return False
-        return True
+        return bool(self.world.robots[pos] <= 1)
+
+    def count_wastes(self):
+        """Return a dict with the number of wastes of each color lying on the grid."""
+        counts = self.world.waste_counts
+        return {"green": int(counts[0]), "yellow": int(counts[1]), "red": int(counts[2])}
+
+    def waste_positions(self, color):
+        """Return the positions of the remaining wastes of the given color."""
+        return self.world.waste_positions(color)
@@ -0,0 +1,93 @@
+import numpy as np
+
+from knowledge import UNEXPLORED
+
+
+class FrontierIndex:
+    """Unexplored cells of a robot knowledge grid.
+
+    The unexplored cells are kept in a boolean array shaped like the grid, with the number of
+    unexplored cells of each row, so the nearest one can be found by looking at the rows around
+    the robot only, empty rows being skipped, and exploring cells is a single mask write.
+    Rows and columns are the ones of the knowledge grid, positions are given and returned in
+    the robot coordinates of RobotAgent.get_pos (x = len(grid) - 1 - row, y = column).
+    """
+
+    def __init__(self, grid):
+        self.unexplored = np.asarray(grid) == UNEXPLORED
+        self.n_rows, self.n_columns = self.unexplored.shape
+        self.row_counts = self.unexplored.sum(axis=1)
+        self.last = None  # (row, column) of the last cell returned by nearest
+        self.explored_columns = 0  # the columns before it are all explored
+
+    def __len__(self):
+        return int(self.row_counts.sum())
+
+    def discard(self, row, column):
+        """Mark a cell as explored."""
+        if self.unexplored[row, column]:
+            self.unexplored[row, column] = False
+            self.row_counts[row] -= 1
+
+    def discard_block(self, row, column, values):
+        """Mark as explored the cells of a block written at (row, column) with a known value."""
+        values = np.asarray(values)
+        block = self.unexplored[row : row + len(values), column : column + values.shape[1]]
+        explored = block & (values != UNEXPLORED)
+        self.row_counts[row : row + len(values)] -= explored.sum(axis=1)
+        block[explored] = False
+
+    def discard_cells(self, cells):
+        """Mark as explored the cells given by their distinct flat indices in the grid."""
+        flat = self.unexplored.reshape(-1)
+        cells = cells[flat[cells]]
+        flat[cells] = False
+        self.row_counts -= np.bincount(cells // self.n_columns, minlength=self.n_rows)
+
+    def nearest(self, pos, max_column=None, prefer_right=False):
+        """Return the nearest unexplored cell to pos (Manhattan distance) as a tuple (x, y),
+        or None if every cell is explored.
+
+        Ties are broken in favour of the upper cell, then of the left one
+        (or of the right one with prefer_right). Cells after max_column are ignored.
+
+        The non empty rows of a square around the robot are searched at once, the square growing
+        until it holds a cell nearer than its radius, which no cell outside can beat. While the
+        last cell returned is still unexplored, its distance bounds the radius of the square,
+        which is then searched once. Cells never get unexplored again, so once the columns
+        before max_column are all explored, the next queries return None right away.
+        """
+        x, y = pos
+        robot_row = self.n_rows - 1 - x
+        end = self.n_columns if max_column is None else min(max_column + 1, self.n_columns)
+        if end <= self.explored_columns:
+            return None
+        radius = 4
+        if self.last is not None and self.last[1] < end and self.unexplored[self.last]:
+            radius = abs(self.last[0] - robot_row) + abs(self.last[1] - y)
+        while True:
+            low = max(robot_row - radius, 0)
+            high = min(robot_row + radius + 1, self.n_rows)
+            left = max(y - radius, 0)
+            right = min(y + radius + 1, end)
+            rows = low + np.flatnonzero(self.row_counts[low:high])
+            box_rows, columns = np.nonzero(self.unexplored[rows, left:right])
+            covers_grid = low == 0 and high == self.n_rows and left == 0 and right >= end
+            if len(columns) > 0:
+                rows = rows[box_rows]
+                columns += left
+                distances = np.abs(rows - robot_row) + np.abs(columns - y)
+                best = distances.min()
+                if best <= radius or covers_grid:
+                    nearest = np.flatnonzero(distances == best)
+                    # the rows are sorted, the first of the best cells is the upper one
+                    first = nearest[rows[nearest] == rows[nearest[0]]]
+                    column = columns[first].max() if prefer_right else columns[first].min()
+                    self.last = (int(rows[first[0]]), int(column))
+                    return (self.n_rows - 1 - self.last[0], self.last[1])
+                radius = int(best)
+            elif covers_grid:
+                self.explored_columns = max(self.explored_columns, end)
+                return None
+            else:
+                radius *= 2
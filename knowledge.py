@@ -0,0 +1,53 @@
+import numpy as np
+
+EMPTY = -1
+UNEXPLORED = -2
+
+
+class Knowledge:
+    """State of a robot: its last observation, its map of the grid and the waste it carries.
+
+    The grid uses one signed byte per cell (the color of the waste, EMPTY, or UNEXPLORED),
+    and the carried waste a single integer, so the memory of a robot grows with the grid only.
+
+    attr:
+        grid: what the robot knows of each cell of the grid, borders included (int8)
+        carried: color of the carried waste, EMPTY if the robot carries nothing
+        carried_by_others: for each color, the waste carried by the other robots at their position
+        id: unique ids of the robots of the mission (tuple shared by all the robots)
+        radioactivity, color_waste, is_waste_disposal, is_wall, other_robots: 3*3 observation
+            around the robot
+        success: whether the last action succeeded
+    """
+
+    __slots__ = (
+        "grid",
+        "carried",
+        "carried_by_others",
+        "id",
+        "radioactivity",
+        "color_waste",
+        "is_waste_disposal",
+        "is_wall",
+        "other_robots",
+        "success",
+    )
+
+    def __init__(self, grid_size, percepts, ids):
+        self.grid = np.full((grid_size + 2, grid_size + 2), UNEXPLORED, dtype=np.int8)
+        self.carried = EMPTY
+        self.carried_by_others = {0: {}, 1: {}, 2: {}}
+        self.id = ids
+        self.observe(percepts)
+
+    def observe(self, percepts):
+        """Replace the observation by the percepts returned by the environment."""
+        self.radioactivity = percepts["radioactivity"]
+        self.color_waste = percepts["color_waste"]
+        self.is_waste_disposal = percepts["is_waste_disposal"]
+        self.is_wall = percepts["is_wall"]
+        self.other_robots = percepts["other_robots"]
+        self.success = percepts["success"]
+
+    def is_carrying(self):
+        return self.carried != EMPTY
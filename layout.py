@@ -0,0 +1,99 @@
+import numpy as np
+
+# Layout of the original mission: three zones of equal width with a constant radioactivity
+# and a waste disposal zone on the middle rows of the last two columns
+DEFAULT_ZONES = [
+    {"end": 1 / 3, "level": 0},
+    {"end": 2 / 3, "level": 0.5},
+    {"end": 1, "level": 0.8},
+]
+DEFAULT_DISPOSALS = [{"columns": [[1, -2], 1], "rows": [[0.5, -1.5], [0.5, 2]]}]
+
+
+class ZoneLayout:
+    """Declarative description of the static layers of the map (radioactivity, waste disposal
+    zone and walls), independent of the size of the grid.
+
+    The zones split the columns of the grid from left to right. A zone contains the columns c
+    with c < end * width that don't belong to a previous zone, its radioactivity is either a
+    constant level or a pair [first, last] of levels linearly interpolated from the first to
+    the last column of the zone. The three zones are the ones of the green, yellow and red
+    wastes, and the last column of the green and yellow zones hold the deposits of the robots.
+    The heuristic robots find their deposits by the radioactivity, so the green zone must stay
+    under 1/3 and the yellow zone under 2/3.
+
+    The disposal zone and the walls are lists of rectangles {"columns": [start, stop],
+    "rows": [start, stop]} holding the cells with start <= index < stop. A bound is either a
+    fraction of the size of the grid or a pair [fraction, cells] giving fraction * size + cells.
+
+    Nothing depends on the number of cells: the values are computed column by column and
+    rectangle by rectangle. The robots can't stand on the walls.
+    """
+
+    def __init__(self, zones=None, disposals=None, walls=None):
+        self.zones = DEFAULT_ZONES if zones is None else zones
+        self.disposals = DEFAULT_DISPOSALS if disposals is None else disposals
+        self.walls = [] if walls is None else walls
+        if len(self.zones) != 3:
+            raise ValueError(
+                "A layout needs 3 zones (green, yellow, red), got " + str(len(self.zones))
+            )
+        self.ends = np.array([zone["end"] for zone in self.zones], dtype=float)
+        if (np.diff(self.ends) < 0).any():
+            raise ValueError("The ends of the zones must increase, got " + str(self.ends))
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a layout from the optional "layout" entry of a config."""
+        layout = config.get("layout") or {}
+        return cls(layout.get("zones"), layout.get("disposals"), layout.get("walls"))
+
+    def column_zones(self, width):
+        """Return the zone of each column: 0 green, 1 yellow, 2 red."""
+        columns = np.arange(width)
+        zones = np.searchsorted(self.ends * width, columns, side="right")
+        return np.minimum(zones, len(self.zones) - 1)
+
+    def deposit_columns(self, width):
+        """Return the last columns of the green and of the yellow zone."""
+        zones = self.column_zones(width)
+        return tuple(int(np.searchsorted(zones, color, side="right")) - 1 for color in (0, 1))
+
+    def column_levels(self, width):
+        """Return the radioactivity of each column."""
+        zones = self.column_zones(width)
+        first = np.searchsorted(zones, zones, side="left")
+        last = np.searchsorted(zones, zones, side="right") - 1
+        starts = np.array([np.ravel(zone["level"])[0] for zone in self.zones], dtype=float)
+        stops = np.array([np.ravel(zone["level"])[-1] for zone in self.zones], dtype=float)
+        ratio = (np.arange(width) - first) / np.maximum(last - first, 1)
+        return starts[zones] + (stops[zones] - starts[zones]) * ratio
+
+    @staticmethod
+    def bound(value, size):
+        fraction, cells = (value, 0) if np.isscalar(value) else value
+        return int(np.ceil(fraction * size + cells))
+
+    def rectangles(self, rectangles, width, height):
+        """Return the (columns, rows) slices covered by each rectangle, clipped to the grid."""
+        slices = []
+        for rectangle in rectangles:
+            spans = []
+            bounds = (rectangle["columns"], rectangle["rows"])
+            for (start, stop), size in zip(bounds, (width, height)):
+                start = min(max(self.bound(start, size), 0), size)
+                stop = min(max(self.bound(stop, size), start), size)
+                spans.append(slice(start, stop))
+            slices.append(tuple(spans))
+        return slices
+
+    def fill(self, world):
+        """Write the layout in the static layers of a WorldState."""
+        world.radioactivity[:] = self.column_levels(world.width)[:, None]
+        world.is_waste_disposal[:] = 0
+        for area in self.rectangles(self.disposals, world.width, world.height):
+            world.is_waste_disposal[area] = 1
+        world.is_wall[:] = 0
+        for area in self.rectangles(self.walls, world.width, world.height):
+            world.is_wall[area] = 1
+        world.walls_version += 1
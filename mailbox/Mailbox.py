@@ -1,56 +1,111 @@
 #!/usr/bin/env python3
 
+from collections import deque
+
 
 class Mailbox:
     """Mailbox class.
     Class implementing the mailbox object which manages messages in communicating agents.
 
+    Messages are indexed by performative and by sender, and only the messages allowed by the
+    retention policy are kept: the last max_messages messages and/or the messages received
+    during the last max_age steps (as given by clock).
+
     attr:
         unread_messages: The list of unread messages
         read_messages: The list of read messages
+        received: every kept message as (step, message), in arrival order
+        by_performative: the kept messages for each performative, in arrival order
+        by_exp: the kept messages for each sender, in arrival order
+        unread_counts: the number of unread messages at the end of each index
     """
 
-    def __init__(self):
+    def __init__(self, max_messages=None, max_age=None, clock=None):
         """Create a new Mailbox."""
-        self.__unread_messages = []
-        self.__read_messages = []
+        if max_age is not None and clock is None:
+            raise ValueError("A clock is required to keep messages by age")
+        self.__max_messages = max_messages
+        self.__max_age = max_age
+        self.__clock = clock
+        self.__unread_messages = deque()
+        self.__read_messages = deque()
+        self.__received = deque()
+        self.__by_performative = {}
+        self.__by_exp = {}
+        self.__unread_counts = {}
 
     def receive_messages(self, message):
         """Receive a message and add it in the unread messages list."""
-
+        step = self.__clock() if self.__clock is not None else None
         self.__unread_messages.append(message)
+        self.__received.append((step, message))
+        for key, index in self.__indexes(message):
+            index.setdefault(key, deque()).append(message)
+            self.__unread_counts[key] = self.__unread_counts.get(key, 0) + 1
+        self.__evict()
 
     def get_new_messages(self):
         """Return all the messages from unread messages list."""
-
-        unread_messages = self.__unread_messages.copy()
-
-        if len(unread_messages) > 0:
-
-            for messages in unread_messages:
-                self.__read_messages.append(messages)
-
+        self.__evict()
+        unread_messages = list(self.__unread_messages)
+        self.__read_messages.extend(unread_messages)
         self.__unread_messages.clear()
+        self.__unread_counts.clear()
         return unread_messages
 
     def get_messages(self):
         """Return all the messages from both unread and read messages list."""
         if len(self.__unread_messages) > 0:
             self.get_new_messages()
-        return self.__read_messages
+        else:
+            self.__evict()
+        return list(self.__read_messages)
 
     def get_messages_from_performative(self, performative):
         """Return a list of messages which have the same performative."""
-        messages_from_performative = []
-        for message in self.__unread_messages + self.__read_messages:
-            if message.get_performative() == performative:
-                messages_from_performative.append(message)
-        return messages_from_performative
+        return self.__lookup(self.__by_performative, ("performative", performative))
 
     def get_messages_from_exp(self, exp):
         """Return a list of messages which have the same sender."""
-        messages_from_exp = []
-        for message in self.__unread_messages + self.__read_messages:
-            if message.get_exp() == exp:
-                messages_from_exp.append(message)
-        return messages_from_exp
+        return self.__lookup(self.__by_exp, ("exp", exp))
+
+    def __indexes(self, message):
+        """Return the index keys of a message along with the index they belong to."""
+        return (
+            (("performative", message.get_performative()), self.__by_performative),
+            (("exp", message.get_exp()), self.__by_exp),
+        )
+
+    def __lookup(self, index, key):
+        """Return the indexed messages, unread ones first as in the unindexed mailbox."""
+        self.__evict()
+        messages = index.get(key)
+        if messages is None:
+            return []
+        messages = list(messages)
+        n_read = len(messages) - self.__unread_counts.get(key, 0)
+        return messages[n_read:] + messages[:n_read]
+
+    def __evict(self):
+        """Drop the oldest messages which are not allowed by the retention policy anymore."""
+        if self.__max_age is not None:
+            oldest_step = self.__clock() - self.__max_age
+        while len(self.__received) > 0 and (
+            (
+                self.__max_messages is not None
+                and len(self.__received) > self.__max_messages
+            )
+            or (self.__max_age is not None and self.__received[0][0] < oldest_step)
+        ):
+            _, message = self.__received.popleft()
+            if len(self.__read_messages) > 0:
+                self.__read_messages.popleft()
+            else:
+                self.__unread_messages.popleft()
+            for key, index in self.__indexes(message):
+                messages = index[key]
+                if len(messages) == self.__unread_counts.get(key, 0):
+                    self.__unread_counts[key] -= 1
+                messages.popleft()
+                if len(messages) == 0:
+                    del index[key]
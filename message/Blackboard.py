@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+
+class Blackboard:
+    """Blackboard class.
+    Class implementing a board shared by a team of agents: each agent publishes its content once
+    and every other agent reads it, instead of sending one message to each of them.
+
+    The delivery follows the message service: with instant delivery a publication can be read
+    right away, otherwise it only becomes readable after the next call to dispatch.
+
+    attr:
+        instant_delivery: whether publications are readable as soon as they are published
+        entries: the readable publications as (sender, content) tuples (list)
+        pending: the publications waiting for the next dispatch (list)
+        cursors: for each reader, the index of the next publication it has to read (dict)
+        offset: the number of publications already dropped from the entries list
+    """
+
+    def __init__(self, instant_delivery=True):
+        """Create a new Blackboard."""
+        self.__instant_delivery = instant_delivery
+        self.__entries = []
+        self.__pending = []
+        self.__cursors = {}
+        self.__offset = 0
+
+    def set_instant_delivery(self, instant_delivery):
+        """Set the instant delivery parameter."""
+        self.__instant_delivery = instant_delivery
+
+    def register_reader(self, reader):
+        """Add a reader which will receive every publication made from now on."""
+        self.__cursors[reader] = self.__offset + len(self.__entries)
+
+    def unregister_reader(self, reader):
+        """Remove a reader."""
+        self.__cursors.pop(reader, None)
+
+    def publish(self, sender, content):
+        """Publish content for all the other readers."""
+        if self.__instant_delivery:
+            self.__entries.append((sender, content))
+        else:
+            self.__pending.append((sender, content))
+
+    def read(self, reader):
+        """Return the contents published by the other agents since the last reading of reader."""
+        start = self.__cursors[reader] - self.__offset
+        self.__cursors[reader] = self.__offset + len(self.__entries)
+        return [
+            content
+            for sender, content in self.__entries[start:]
+            if sender != reader
+        ]
+
+    def dispatch(self):
+        """Make the pending publications readable and drop the ones every reader has read."""
+        self.__entries.extend(self.__pending)
+        self.__pending.clear()
+        if len(self.__cursors) > 0:
+            read_by_all = min(self.__cursors.values()) - self.__offset
+        else:
+            read_by_all = len(self.__entries)
+        del self.__entries[:read_by_all]
+        self.__offset += read_by_all
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+from message.Blackboard import Blackboard
+
 
 class MessageService:
     """MessageService class.
@@ -10,6 +12,8 @@ class MessageService:
     attr:
 
         messages_to_proceed: the list of message to proceed mailbox of the agent (list)
+        agents: the registered agents indexed by their id (dict)
+        blackboard: the board on which agents publish what they share with everyone (Blackboard)
     """
 
     __instance = None
@@ -28,10 +32,17 @@ class MessageService:
         self.__model = model
         self.__instant_delivery = instant_delivery
         self.__messages_to_proceed = []
+        self.__agents = {agent.unique_id: agent for agent in model.agents}
+        self.__blackboard = Blackboard(instant_delivery)
 
     def set_instant_delivery(self, instant_delivery):
         """Set the instant delivery parameter."""
         self.__instant_delivery = instant_delivery
+        self.__blackboard.set_instant_delivery(instant_delivery)
+
+    def get_blackboard(self):
+        """Return the blackboard shared by the agents of the model."""
+        return self.__blackboard
 
     def send_message(self, message):
         """Dispatch message if instant delivery active, otherwise add the message to proceed list."""
@@ -52,10 +63,22 @@ class MessageService:
                 self.dispatch_message(message)
 
         self.__messages_to_proceed.clear()
+        self.__blackboard.dispatch()
+
+    def register_agent(self, agent):
+        """Make the agent reachable by the messages sent to its id."""
+        self.__agents[agent.unique_id] = agent
+
+    def unregister_agent(self, agent):
+        """Stop delivering messages to the agent."""
+        self.__agents.pop(agent.unique_id, None)
+        self.__blackboard.unregister_reader(agent.unique_id)
 
     def find_agent_from_id(self, agent_id):
         """Return the agent according to the agent name given."""
-
-        for agent in self.__model.agents:
-            if agent.unique_id == agent_id:
-                return agent
+        try:
+            return self.__agents[agent_id]
+        except KeyError:
+            raise ValueError(
+                "No agent with id " + str(agent_id) + " is registered in the message service"
+            ) from None
@@ -1,23 +1,57 @@
 import numpy as np
 from mesa import Model
-from mesa.space import MultiGrid
 
 from agents import (GreenAgent, RandomGreenAgent, RandomRedAgent,
                     RandomYellowAgent, RedAgent, RobotAgent, YellowAgent)
-from env import Environment, Radioactivity, Waste
+from assignment import AssignmentEngine
+from controller import RandomPolicy
+from deposits import DepositSlots
+from env import STEP_POLICIES, Environment
+from frontier import FrontierIndex
+from knowledge import Knowledge
+from layout import ZoneLayout
 from message.MessageService import MessageService
+from placement import Placement
+from planner import PathPlanner
+from world import WorldState
 
 
 class RobotMission(Model):
     def __init__(
-        self, n_agents, n_wastes, grid_size, use_random_agents=True, seed=None
+        self,
+        n_agents,
+        n_wastes,
+        grid_size,
+        use_random_agents=True,
+        seed=None,
+        step_policy=None,
+        layout=None,
+        world=None,
+        cache_observations=False,
     ):
         """
         n_agents is a dict with the number of agents per color
+        seed drives every random draw of the mission (placement and policies)
+        through the model generators self.random and self.rng
+        step_policy ("sequential" or "simultaneous", see Environment.step_batch) makes a
+        RandomPolicy sample the actions of all the random robots at once and applies them
+        in one call to the environment, instead of letting each robot deliberate and act
+        in turn (random agents only)
+        layout is the ZoneLayout of the radioactivity, waste disposal zone and walls,
+        the layout of the original mission by default
+        world is an empty WorldState of size grid_size * grid_size holding the map,
+        a new one by default
+        cache_observations keeps the observations of the robots in an ObservationCache
         """
         super().__init__(seed=seed)
         self.grid_size = grid_size
         self.n_wastes = n_wastes
+        self.layout = ZoneLayout() if layout is None else layout
+        # last columns of the green and yellow zones, holding the deposits
+        self.deposit_columns = self.layout.deposit_columns(grid_size)
+        # robots of each color (color_to_gather), updated when a robot is added or removed
+        self.robots_by_color = {0: [], 1: [], 2: []}
+        self.__robot_ids = None
         self.__messages_service = MessageService(self)
         self.running = True
         if use_random_agents:
@@ -29,120 +63,138 @@ class RobotMission(Model):
             self.yellowagent = YellowAgent
             self.redagent = RedAgent
         green_agents = [
-            self.greenagent(self, knowledge={}) for _ in range(n_agents["green"])
+            self.greenagent(self, knowledge=None) for _ in range(n_agents["green"])
         ]
         yellow_agents = [
-            self.yellowagent(self, knowledge={}) for _ in range(n_agents["yellow"])
+            self.yellowagent(self, knowledge=None) for _ in range(n_agents["yellow"])
         ]
-        red_agents = [self.redagent(self, knowledge={}) for _ in range(n_agents["red"])]
-        self.grid = MultiGrid(grid_size, grid_size, False)
-        self.already_placed = set()
-        for agent in green_agents + yellow_agents + red_agents:
-            self.place_robot_agents(agent)
-        self.radioactivity_map = np.zeros((grid_size, grid_size))
-        self.place_cell_agents()
-        self.env = Environment(self, self.grid)
+        red_agents = [self.redagent(self, knowledge=None) for _ in range(n_agents["red"])]
+        self.world = WorldState(grid_size, grid_size) if world is None else world
+        # zone of each column: 0 green, 1 yellow, 2 red
+        self.zones = self.layout.column_zones(grid_size)
+        self.layout.fill(self.world)
+        self.place_robots_and_wastes()
+        self.radioactivity_map = self.world.radioactivity_map()
+        self.env = Environment(self, self.world, cache_observations)
+        self.assignment = AssignmentEngine(self)
+        self.planner = PathPlanner(self.world)
+        # Columns where the green and yellow robots drop the wastes they merged,
+        # the top cell of the yellow deposit being the green deposit
+        green_column, yellow_column = self.deposit_columns
+        self.yellow_deposit_slots = DepositSlots(
+            self.world, green_column, excluded=[grid_size - 1]
+        )
+        self.red_deposit_slots = DepositSlots(self.world, yellow_column)
         self.initialize_agent()
+        if step_policy is not None and step_policy not in STEP_POLICIES:
+            raise ValueError(
+                "Unknown step policy " + str(step_policy) + ", expected one of " + str(STEP_POLICIES)
+            )
+        if step_policy is not None and not use_random_agents:
+            raise ValueError("step_policy is only available for the random agents")
+        self.step_policy = step_policy
+        self.policy = None
+        if step_policy is not None:
+            self.policy = RandomPolicy(self, green_agents + yellow_agents + red_agents)
 
-    def place_robot_agents(self, agent):
-        placed = False
-        while not placed:
-            if isinstance(agent, self.greenagent):
-                random_x = np.random.randint(0, self.grid.width / 3)
-                random_y = np.random.randint(0, self.grid.height)
-            elif isinstance(agent, self.yellowagent):
-                random_x = np.random.randint(0, self.grid.width / 3 * 2)
-                random_y = np.random.randint(0, self.grid.height)
-            else:
-                random_x = np.random.randint(0, self.grid.width)
-                random_y = np.random.randint(0, self.grid.height)
-            random_pos = (random_x, random_y)
-            if random_pos not in self.already_placed:
-                self.already_placed.add(random_pos)
-                placed = True
-        self.grid.place_agent(agent, random_pos)
-        agent.pos = random_pos
-
-    def place_cell_agents(self):
-        # Place radioactivity
-        for i in range(self.grid.width):
-            for j in range(self.grid.height):
-                pos = (i, j)
-                is_waste_disposal = 0
-                if i < self.grid.width / 3:
-                    level = 0
-                elif self.grid.width / 3 <= i < (self.grid.width / 3) * 2:
-                    level = 0.5
-                else:
-                    level = 0.8
-                level_plot = level
-                # add a 2*5 waste zone right
-                if (
-                    self.grid.width - 2 <= i < self.grid.width
-                    and j > (self.grid.height / 2) - 2
-                    and j < (self.grid.height / 2) + 2
-                ):
-                    is_waste_disposal = 1
-                    level_plot = 2
-                radioactivity = Radioactivity(self, level, is_waste_disposal, 0)
-                self.radioactivity_map[j, i] = level_plot
-                self.grid.place_agent(radioactivity, pos)
-                radioactivity.pos = pos
-        # Place wastes randomly
-        green_wastes = [
-            Waste(self, color_waste=0) for _ in range(self.n_wastes["green"])
+    def place_robots_and_wastes(self):
+        """Place the robots (green ones in the green zone, yellow ones in the green and yellow
+        zones, red ones anywhere) and the wastes (in the zone of their color) on distinct cells.
+
+        Every position is drawn before anything is placed, so a zone too small for its robots
+        or wastes raises a ValueError and leaves the grid empty.
+        """
+        shape = (self.world.width, self.world.height)
+        placement = Placement(*shape, self.rng)
+        placement.free &= self.world.is_wall == 0
+        zones = np.broadcast_to(self.zones[:, None], shape)
+        names = ["green", "yellow", "red"]
+        robot_positions = [
+            placement.sample(zones <= color, len(robots), names[color] + " robots")
+            for color, robots in self.robots_by_color.items()
         ]
-        yellow_wastes = [
-            Waste(self, color_waste=1) for _ in range(self.n_wastes["yellow"])
+        waste_positions = [
+            placement.sample(zones == color, self.n_wastes[name], name + " wastes")
+            for color, name in enumerate(names)
         ]
-        red_wastes = [Waste(self, color_waste=2) for _ in range(self.n_wastes["red"])]
-        wastes = green_wastes + yellow_wastes + red_wastes
-        np.random.shuffle(wastes)
-        for waste in wastes:
-            placed = False
-            while not placed:
-                if waste.color_waste == 0:
-                    random_x = np.random.randint(0, self.grid.width / 3)
-                    random_y = np.random.randint(0, self.grid.height)
-                elif waste.color_waste == 1:
-                    random_x = np.random.randint(
-                        self.grid.width / 3 + 1, self.grid.width / 3 * 2
-                    )
-                    random_y = np.random.randint(0, self.grid.height)
-                else:
-                    random_x = np.random.randint(
-                        self.grid.width / 3 * 2 + 1, self.grid.width
-                    )
-                    random_y = np.random.randint(0, self.grid.height)
-                random_pos = (random_x, random_y)
-                if random_pos not in self.already_placed:
-                    self.already_placed.add(random_pos)
-                    placed = True
-            self.grid.place_agent(waste, random_pos)
-            waste.pos = random_pos
+        for robots, positions in zip(self.robots_by_color.values(), robot_positions):
+            for robot, pos in zip(robots, positions.tolist()):
+                pos = tuple(pos)
+                self.world.place_robot(pos)
+                robot.pos = pos
+        for color, positions in enumerate(waste_positions):
+            for pos in positions.tolist():
+                self.world.add_waste(tuple(pos), color)
+
+    def get_messages_service(self):
+        return self.__messages_service
+
+    def register_agent(self, agent):
+        super().register_agent(agent)
+        self.__messages_service.register_agent(agent)
+        if isinstance(agent, RobotAgent):
+            self.robots_by_color[agent.color_to_gather].append(agent)
+            self.__robot_ids = None
+
+    def deregister_agent(self, agent):
+        super().deregister_agent(agent)
+        self.__messages_service.unregister_agent(agent)
+        if isinstance(agent, RobotAgent):
+            self.robots_by_color[agent.color_to_gather].remove(agent)
+            self.__robot_ids = None
+
+    def robots(self):
+        """Return every robot, color by color."""
+        return [robot for robots in self.robots_by_color.values() for robot in robots]
+
+    @property
+    def robot_ids(self):
+        """Unique ids of every robot, as a tuple shared by all the robots."""
+        if self.__robot_ids is None:
+            self.__robot_ids = tuple(robot.unique_id for robot in self.robots())
+        return self.__robot_ids
+
+    def all_wastes_disposed(self):
+        """Return True when no waste is left on the grid nor carried by a robot."""
+        return self.world.waste_counts.sum() == 0 and not any(
+            robot.knowledge.is_carrying() for robot in self.robots()
+        )
 
     def step(self):
         self.__messages_service.dispatch_messages()
-        self.agents.shuffle_do("step")
+        if self.policy is None:
+            self.agents.shuffle_do("step")
+            return
+        self.apply_actions(self.policy.plan())
+
+    def apply_actions(self, actions):
+        """Apply the actions of the robots of the policy (given in the order of policy.robots)
+        with the step policy and give each robot its new observation."""
+        planned = dict(zip(self.policy.robots, actions.tolist()))
+        # same order as shuffle_do
+        robots = list(self.agents.shuffle())
+        actions = [planned[robot] for robot in robots]
+        neighbourhoods, success = self.env.step_batch(
+            robots, actions, policy=self.step_policy
+        )
+        for robot, action, neighbourhood, can_pickup in zip(
+            robots, actions, neighbourhoods, success
+        ):
+            robot.perceive(self.env.to_observation(neighbourhood, bool(can_pickup)), action)
 
     def initialize_agent(self):
-        for agent in self.agents:
-            if isinstance(agent, RobotAgent):
-                knowledge = self.env.get_info(agent.pos)
-                knowledge["carried"] = []
-                knowledge["grid"] = (
-                    np.zeros((self.grid_size + 2, self.grid_size + 2)) - 2
-                )
-                knowledge["id"] = [
-                    agent.unique_id
-                    for agent in self.agents
-                    if isinstance(agent, RobotAgent)
-                ]
-                agent.knowledge = knowledge
+        robots = self.robots()
+        for agent, percepts in zip(robots, self.env.get_infos(robots)):
+            agent.knowledge = Knowledge(self.grid_size, percepts, self.robot_ids)
+            self.assignment.observe(
+                agent.observed_cells(*agent.get_pos()),
+                percepts["color_waste"].reshape(-1).astype(np.int8),
+            )
+            agent.frontier = FrontierIndex(agent.knowledge.grid)
 
     def do(self, agent, action):
         perceipt = self.env.step(agent, action)
         return perceipt
 
     def get_robot_agents_pos(self):
-        return [agent.pos for agent in self.agents if isinstance(agent, RobotAgent)]
+        return [robot.pos for robot in self.robots()]
@@ -0,0 +1,260 @@
+import copy
+
+import numpy as np
+
+from controller import sample_actions
+from env import MOVE_OFFSETS, Environment
+from model import RobotMission
+from world import (CHANNELS, COLOR_WASTE, EMPTY, IS_WALL, IS_WASTE_DISPOSAL, N_COLORS,
+                   OTHER_ROBOTS, WorldState, neighbourhood_cells)
+
+
+class WorldStack:
+    """Maps of several missions of the same size stored in arrays with a leading batch
+    dimension, each WorldState of worlds being a view on one entry of the batch.
+
+    attr:
+        layers: the padded observable layers of every map
+            (shape n * 5 * (width + 2) * (height + 2))
+        wastes: number of wastes of each color on each cell (shape n * 3 * width * height)
+        waste_counts: number of wastes of each color lying on each map (shape n * 3)
+        worlds: the WorldState of each map
+    """
+
+    def __init__(self, n_worlds, width, height):
+        self.width = width
+        self.height = height
+        self.layers = np.empty((n_worlds, len(CHANNELS), width + 2, height + 2))
+        self.wastes = np.zeros((n_worlds, N_COLORS, width, height), dtype=np.int32)
+        self.waste_counts = np.zeros((n_worlds, N_COLORS), dtype=np.int64)
+        self.worlds = [
+            WorldState(width, height, self.layers[k], self.wastes[k], self.waste_counts[k])
+            for k in range(n_worlds)
+        ]
+        # views on the inside of the layers of every map, as the ones of WorldState
+        self.waste_color = self.layers[:, COLOR_WASTE, 1:-1, 1:-1]
+        self.is_waste_disposal = self.layers[:, IS_WASTE_DISPOSAL, 1:-1, 1:-1]
+        self.is_wall = self.layers[:, IS_WALL, 1:-1, 1:-1]
+        self.robots = self.layers[:, OTHER_ROBOTS, 1:-1, 1:-1]
+
+    def step_batch(self, envs, positions, actions):
+        """Apply the actions of robots of several maps at once, as Environment.step_batch does
+        with the simultaneous policy: the picks, then the releases in the order of the robots,
+        then the moves, a move succeeding if its cell is inside the map, isn't a wall, was free
+        at the beginning of the step and isn't the cell of an earlier move of the same map.
+
+        envs gives the map of each robot and positions their (x, y) cells, updated in place.
+        Return the indices of the robots which moved, and the stacked observations
+        (shape n * 5 * 3 * 3) and pickup successes of the robots after all the actions.
+        """
+        x, y = positions[:, 0], positions[:, 1]
+        can_pickup = self.robots[envs, x, y] <= 1
+        changed = []
+
+        picking = np.flatnonzero((actions == 0) & can_pickup)
+        picking = picking[self.waste_color[envs[picking], x[picking], y[picking]] != EMPTY]
+        cells = envs[picking], x[picking], y[picking]
+        np.subtract.at(self.waste_counts, cells[0], self.wastes[cells[0], :, cells[1], cells[2]])
+        self.wastes[cells[0], :, cells[1], cells[2]] = 0
+        self.waste_color[cells] = EMPTY
+        changed.append(picking)
+
+        releasing = np.flatnonzero((actions >= 1) & (actions <= 3))
+        disposal = self.is_waste_disposal[envs[releasing], x[releasing], y[releasing]] == 1
+        # a release on the waste disposal zone removes every waste of the cell
+        disposing = releasing[disposal]
+        cells = envs[disposing], x[disposing], y[disposing]
+        disposing = disposing[self.waste_color[cells] != EMPTY]
+        keys = (envs[disposing] * self.width + x[disposing]) * self.height + y[disposing]
+        disposing = disposing[np.unique(keys, return_index=True)[1]]
+        cells = envs[disposing], x[disposing], y[disposing]
+        np.subtract.at(self.waste_counts, cells[0], self.wastes[cells[0], :, cells[1], cells[2]])
+        self.wastes[cells[0], :, cells[1], cells[2]] = 0
+        self.waste_color[cells] = EMPTY
+        changed.append(disposing)
+
+        dropping = releasing[~disposal]
+        colors = actions[dropping] - 1
+        cells = envs[dropping], x[dropping], y[dropping]
+        np.add.at(self.wastes, (cells[0], colors, cells[1], cells[2]), 1)
+        np.add.at(self.waste_counts, (cells[0], colors), 1)
+        # the color of a cell is the one of the last waste released on it
+        keys = (cells[0] * self.width + cells[1]) * self.height + cells[2]
+        last = len(dropping) - 1 - np.unique(keys[::-1], return_index=True)[1]
+        dropping = dropping[last]
+        self.waste_color[envs[dropping], x[dropping], y[dropping]] = actions[dropping] - 1
+        changed.append(dropping)
+
+        for k in np.concatenate(changed).tolist():
+            self.worlds[envs[k]].wastes_changed((int(x[k]), int(y[k])))
+
+        moving = np.flatnonzero((actions >= 4) & (actions <= 7))
+        targets = positions[moving] + MOVE_OFFSETS[actions[moving] - 4]
+        inside = (
+            (targets[:, 0] >= 0)
+            & (targets[:, 0] < self.width)
+            & (targets[:, 1] >= 0)
+            & (targets[:, 1] < self.height)
+        )
+        moving, targets = moving[inside], targets[inside]
+        target_envs = envs[moving]
+        free = (self.is_wall[target_envs, targets[:, 0], targets[:, 1]] == 0) & (
+            self.robots[target_envs, targets[:, 0], targets[:, 1]] == 0
+        )
+        moving, targets, target_envs = moving[free], targets[free], target_envs[free]
+        # when several robots of a map move to the same cell, the first one gets it
+        keys = (target_envs * self.width + targets[:, 0]) * self.height + targets[:, 1]
+        first = np.unique(keys, return_index=True)[1]
+        moving, targets = moving[first], targets[first]
+        moved_envs = envs[moving]
+        np.subtract.at(self.robots, (moved_envs, x[moving], y[moving]), 1)
+        self.robots[moved_envs, targets[:, 0], targets[:, 1]] += 1
+        for k, target in zip(moving.tolist(), targets.tolist()):
+            world = self.worlds[envs[k]]
+            if len(world.cell_listeners) > 0:
+                world.robots_changed((int(x[k]), int(y[k])))
+                world.robots_changed(tuple(target))
+        positions[moving] = targets
+
+        xs, ys = neighbourhood_cells(positions)
+        neighbourhoods = np.moveaxis(self.layers[envs[:, None, None], :, xs, ys], -1, 1)
+        success = self.robots[envs, positions[:, 0], positions[:, 1]] <= 1
+        return moving, neighbourhoods, success
+
+
+class BatchRandomPolicy:
+    """RandomPolicy of the robots of several missions, sampled for all of them in one pass.
+
+    Each mission draws the uniform numbers of its robots with its own generator and in the
+    order of its RandomPolicy, so the actions are the ones its RandomPolicy would sample.
+
+    attr:
+        missions: the missions of the batch, with the same fleet
+        robots: the robots of the RandomPolicy of each mission
+        colors, thresholds, can_merge: the ones of the RandomPolicy of each mission
+            (shape n_missions * n_robots)
+    """
+
+    def __init__(self, missions):
+        self.missions = missions
+        policies = [mission.policy for mission in missions]
+        self.robots = [policy.robots for policy in policies]
+        self.colors = np.array([policy.colors for policy in policies])
+        self.thresholds = np.array([policy.thresholds for policy in policies])
+        self.can_merge = np.array([policy.can_merge for policy in policies])
+
+    def plan(self, env_ids):
+        """Return the actions of the robots of the missions env_ids
+        (shape len(env_ids) * n_robots), in the order of their RandomPolicy."""
+        n_robots = self.colors.shape[1]
+        if n_robots == 0:
+            return np.zeros((len(env_ids), 0), dtype=int)
+        knowledges = [robot.knowledge for env_id in env_ids for robot in self.robots[env_id]]
+        uniforms = np.concatenate(
+            [self.missions[env_id].rng.random(n_robots) for env_id in env_ids]
+        )
+        actions = sample_actions(
+            knowledges,
+            self.colors[env_ids].reshape(-1),
+            self.thresholds[env_ids].reshape(-1),
+            self.can_merge[env_ids].reshape(-1),
+            uniforms,
+        )
+        return actions.reshape(len(env_ids), n_robots)
+
+
+class MultiMission:
+    """Independent missions of random robots with the same grid size and fleet, stepped
+    together with the simultaneous step policy.
+
+    The maps of the missions are stored in a WorldStack. At each step, the messages of every
+    mission are delivered, a BatchRandomPolicy samples the actions of the robots of the
+    running missions in one pass, and the WorldStack applies them over the stacked arrays.
+    The robots then update their knowledge one by one. Each mission draws the actions and the
+    order of its robots with its own generators, so the runs are the same as the ones of
+    RobotMission(..., step_policy="simultaneous") with the same seeds.
+
+    attr:
+        missions: the RobotMission of each seed
+        stack: the WorldStack holding the maps of the missions
+        policy: the BatchRandomPolicy of the missions
+    """
+
+    def __init__(self, seeds, n_agents, n_wastes, grid_size, layout=None):
+        self.stack = WorldStack(len(seeds), grid_size, grid_size)
+        self.missions = [
+            RobotMission(
+                n_agents,
+                n_wastes,
+                grid_size,
+                use_random_agents=True,
+                seed=seed,
+                step_policy="simultaneous",
+                layout=layout,
+                world=world,
+            )
+            for seed, world in zip(seeds, self.stack.worlds)
+        ]
+        self.policy = BatchRandomPolicy(self.missions)
+        # index of each robot in the RandomPolicy of its mission
+        self.indices = [
+            {robot: k for k, robot in enumerate(robots)} for robots in self.policy.robots
+        ]
+
+    def step(self, env_ids=None):
+        """Step the missions env_ids (all by default) and return the (n, 3) waste counts
+        of every mission."""
+        if env_ids is None:
+            env_ids = range(len(self.missions))
+        env_ids = np.asarray(env_ids, dtype=np.intp)
+        for env_id in env_ids.tolist():
+            mission = self.missions[env_id]
+            # what Model.step and RobotMission.step do before applying the actions
+            mission.steps += 1
+            mission.get_messages_service().dispatch_messages()
+        planned = self.policy.plan(env_ids)
+        robots = []
+        actions = []
+        for row, env_id in enumerate(env_ids.tolist()):
+            # same order as shuffle_do
+            order = list(self.missions[env_id].agents.shuffle())
+            index = self.indices[env_id]
+            robots += order
+            actions.append(planned[row, [index[robot] for robot in order]])
+        actions = np.concatenate(actions)
+        envs = np.repeat(env_ids, planned.shape[1])
+        positions = np.array([robot.pos for robot in robots], dtype=np.intp).reshape(-1, 2)
+        moved, neighbourhoods, success = self.stack.step_batch(envs, positions, actions)
+        for k in moved.tolist():
+            robots[k].pos = tuple(positions[k].tolist())
+        for robot, action, neighbourhood, can_pickup in zip(
+            robots, actions.tolist(), neighbourhoods, success.tolist()
+        ):
+            robot.perceive(Environment.to_observation(neighbourhood, can_pickup), action)
+        return self.stack.waste_counts
+
+    def run(self, steps, stop=None):
+        """Run every mission for steps steps and return their (3, n, steps) waste counts, laid
+        out as SimulationRecorder.counts.
+
+        With StopConditions (copied for each mission), a mission leaves the batch as soon as one
+        of them holds, as in batch_simulation.visualize_simulation.
+        """
+        counts = np.zeros((N_COLORS, len(self.missions), steps), dtype=np.int32)
+        stops = [None if stop is None else copy.deepcopy(stop) for _ in self.missions]
+        for mission, mission_stop in zip(self.missions, stops):
+            if mission_stop is not None:
+                mission_stop.reset(mission)
+        running = list(range(len(self.missions)))
+        for step in range(steps):
+            if len(running) == 0:
+                break
+            waste_counts = self.step(running)
+            counts[:, running, step] = waste_counts[running].T
+            for env_id in list(running):
+                mission = self.missions[env_id]
+                if stops[env_id] is not None and stops[env_id].check(mission, step) is not None:
+                    counts[:, env_id, step + 1 :] = counts[:, env_id, step, None]
+                    mission.running = False
+                    running.remove(env_id)
+        return counts
@@ -0,0 +1,54 @@
+class ObservationCache:
+    """Neighbourhoods of the world layers, kept from one step to the next.
+
+    The 3*3 neighbourhood of a position is computed the first time it is asked for and kept
+    until a cell around the position changes (a waste picked or dropped, a robot arriving or
+    leaving), which the world reports through its cell listeners. Robots standing still or
+    blocked thus get their observation without reading the layers again. The cached arrays
+    are never modified, a change of a cell only drops the entries around it. Beyond
+    max_entries neighbourhoods, the oldest ones are dropped.
+
+    attr:
+        hits: number of neighbourhoods found in the cache
+        misses: number of neighbourhoods computed from the world
+    """
+
+    def __init__(self, world, max_entries=10000):
+        self.world = world
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__entries = {}
+        world.add_cell_listener(self.invalidate)
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def neighbourhood(self, pos):
+        """Return the 3*3 neighbourhood of pos for every channel (shape 5 * 3 * 3)."""
+        neighbourhood = self.__entries.get(pos)
+        if neighbourhood is None:
+            self.misses += 1
+            neighbourhood = self.world.neighbourhood(pos)
+            self.__entries[pos] = neighbourhood
+            if len(self.__entries) > self.max_entries:
+                del self.__entries[next(iter(self.__entries))]
+        else:
+            self.hits += 1
+        return neighbourhood
+
+    def invalidate(self, pos):
+        """Drop the neighbourhoods containing pos."""
+        x, y = pos
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                self.__entries.pop((x + dx, y + dy), None)
+
+    def stats(self):
+        """Return the number of hits and misses and the hit rate of the cache."""
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests > 0 else 0.0,
+        }
@@ -0,0 +1,35 @@
+import numpy as np
+
+
+class Placement:
+    """Random placement of robots and wastes on distinct cells.
+
+    Each group of items is drawn in one call, without replacement, among the free cells of its
+    zone, so the cost of the placement doesn't depend on how full the zones are. A zone that
+    can't hold its group raises a ValueError instead of looping forever.
+
+    attr:
+        free: False for the cells already given to an item (shape width * height)
+    """
+
+    def __init__(self, width, height, rng):
+        self.free = np.ones((width, height), dtype=bool)
+        self.rng = rng
+
+    def sample(self, zone, count, name):
+        """Draw count distinct free cells of a zone (boolean mask of shape width * height)
+        and return them as an array of positions (shape count * 2)."""
+        cells = np.flatnonzero(zone & self.free)
+        if count > len(cells):
+            raise ValueError(
+                "Cannot place "
+                + str(count)
+                + " "
+                + name
+                + ": only "
+                + str(len(cells))
+                + " free cells in their zone"
+            )
+        chosen = self.rng.choice(cells, size=count, replace=False)
+        self.free.flat[chosen] = False
+        return np.column_stack(np.unravel_index(chosen, self.free.shape))
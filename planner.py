@@ -0,0 +1,93 @@
+from collections import deque
+
+import numpy as np
+
+# (dx, dy) of the moves on the mesa grid
+MOVES = {
+    "move_Up": (0, 1),
+    "move_Right": (1, 0),
+    "move_Down": (0, -1),
+    "move_Left": (-1, 0),
+}
+
+
+class PathPlanner:
+    """Distance fields towards the fixed targets of the map.
+
+    A distance field gives, for every cell of the grid (indexed like the mesa grid), the number
+    of moves needed to reach the nearest of its source cells while staying on cells with a
+    radioactivity under the threshold of the robot and outside the walls. Fields only depend on
+    the static layers of the world, so each one is computed once with a multi-source breadth
+    first search and cached until the walls change, under a fixed key naming its target (a
+    cell, a column or the disposal zone), so that a lookup doesn't depend on the size of the
+    map. Robots standing in the way are handled by the robots themselves when they pick a move
+    along the field.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.__fields = {}
+        self.__walls_version = world.walls_version
+
+    def point_field(self, pos, threshold):
+        """Return the distance field towards the cell pos."""
+        return self.__field(("point", pos, threshold), lambda: [pos], threshold)
+
+    def disposal_field(self, threshold):
+        """Return the distance field towards the waste disposal zone."""
+        return self.__field(("disposal", threshold), self.__disposal_cells, threshold)
+
+    def column_field(self, x, threshold):
+        """Return the distance field towards any cell of the column x."""
+        return self.__field(
+            ("column", x, threshold),
+            lambda: [(x, y) for y in range(self.world.height)],
+            threshold,
+        )
+
+    def __field(self, key, sources, threshold):
+        """Return the cached field of key, computed from the callable sources on a miss."""
+        if self.__walls_version != self.world.walls_version:
+            self.__fields.clear()
+            self.__walls_version = self.world.walls_version
+        field = self.__fields.get(key)
+        if field is None:
+            field = self.__compute(sources(), threshold)
+            self.__fields[key] = field
+        return field
+
+    def __disposal_cells(self):
+        xs, ys = np.nonzero(self.world.is_waste_disposal == 1)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def downhill_moves(self, field, pos):
+        """Return the moves from pos leading to a cell closer to the sources."""
+        x, y = pos
+        moves = []
+        for move, (dx, dy) in MOVES.items():
+            neighbour = (x + dx, y + dy)
+            if self.world.in_bounds(neighbour) and field[neighbour] < field[pos]:
+                moves.append(move)
+        return moves
+
+    def __compute(self, sources, threshold):
+        passable = (self.world.radioactivity <= threshold) & (self.world.is_wall == 0)
+        field = np.full((self.world.width, self.world.height), np.inf)
+        queue = deque()
+        for source in sources:
+            if passable[source] and field[source] == np.inf:
+                field[source] = 0
+                queue.append(source)
+        while len(queue) > 0:
+            x, y = queue.popleft()
+            distance = field[x, y] + 1
+            for dx, dy in MOVES.values():
+                neighbour = (x + dx, y + dy)
+                if (
+                    self.world.in_bounds(neighbour)
+                    and passable[neighbour]
+                    and field[neighbour] == np.inf
+                ):
+                    field[neighbour] = distance
+                    queue.append(neighbour)
+        return field
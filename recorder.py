@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+
+COLORS = ["green", "yellow", "red"]
+
+
+class SimulationRecorder:
+    """Columnar storage of the waste counts of a batch of simulations.
+
+    The counts live in a single int32 array of shape (3, n_simulations, steps), one column per
+    color, allocated once. When a path is given the array is a memory-mapped .npy file, with
+    the description of the batch in a .json file next to it, so that large sweeps don't have
+    to fit in RAM and the results can be reloaded with SimulationRecorder.load.
+    """
+
+    def __init__(self, n_simulations, steps, path=None, metadata=None, counts=None):
+        self.n_simulations = n_simulations
+        self.steps = steps
+        self.path = path
+        self.metadata = {} if metadata is None else metadata
+        shape = (len(COLORS), n_simulations, steps)
+        if counts is not None:
+            self.counts = counts
+        elif path is None:
+            self.counts = np.zeros(shape, dtype=np.int32)
+        else:
+            self.counts = np.lib.format.open_memmap(
+                path, mode="w+", dtype=np.int32, shape=shape
+            )
+            self.__write_metadata()
+
+    @classmethod
+    def load(cls, path):
+        """Open the results recorded in path, without loading them in memory."""
+        counts = np.load(path, mmap_mode="r")
+        with open(metadata_path(path), "r") as f:
+            metadata = json.load(f)
+        _, n_simulations, steps = counts.shape
+        return cls(n_simulations, steps, path=path, metadata=metadata, counts=counts)
+
+    def run(self, simulation):
+        """Return the (3, steps) view in which a simulation records its waste counts."""
+        return self.counts[:, simulation]
+
+    def record(self, simulation, step, counts):
+        """Record the waste counts of each color of a simulation at a given step."""
+        self.counts[:, simulation, step] = counts
+
+    def record_run(self, simulation, counts):
+        """Record the (3, steps) waste counts of a whole simulation."""
+        self.counts[:, simulation] = counts
+
+    def curves(self, color):
+        """Return the (n_simulations, steps) waste counts of a color."""
+        return self.counts[COLORS.index(color)]
+
+    def mean_curve(self, color):
+        """Return the mean waste count of a color at each step."""
+        return self.curves(color).mean(axis=0)
+
+    def flush(self):
+        if isinstance(self.counts, np.memmap):
+            self.counts.flush()
+
+    def __write_metadata(self):
+        with open(metadata_path(self.path), "w") as f:
+            json.dump(self.metadata, f, indent=2)
+
+
+def metadata_path(path):
+    if path.endswith(".npy"):
+        path = path[: -len(".npy")]
+    return path + ".json"
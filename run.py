@@ -3,15 +3,6 @@ import tkinter as tk
 import matplotlib.pyplot as plt
 from matplotlib import colors as mcolors
 
-from agents import (
-    GreenAgent,
-    RandomGreenAgent,
-    RandomRedAgent,
-    RandomYellowAgent,
-    RedAgent,
-    YellowAgent,
-)
-from env import Waste
 from message.MessageService import MessageService
 from model import RobotMission
 
@@ -22,15 +13,6 @@ def visualize_simulation(model, steps=500, use_random_agents=True):
 
     waste_counts = {"green": [], "yellow": [], "red": []}
 
-    if use_random_agents:
-        greenagentclass = RandomGreenAgent
-        yellowagentclass = RandomYellowAgent
-        redagentclass = RandomRedAgent
-    else:
-        greenagentclass = GreenAgent
-        yellowagentclass = YellowAgent
-        redagentclass = RedAgent
-
     for step in range(steps):
         model.step()
         ax.clear()
@@ -47,36 +29,22 @@ def visualize_simulation(model, steps=500, use_random_agents=True):
             model.radioactivity_map, cmap=cmap, norm=norm, origin="upper", alpha=0.6
         )
 
-        # Track waste counts
-        green_count, yellow_count, red_count = 0, 0, 0
-
-        # Draw waste and robot agents
-        for agent in model.agents:
-            if isinstance(agent, Waste) and agent.pos is not None:
-                color = ["green", "yellow", "red"][agent.color_waste]
-                if color == "green":
-                    green_count += 1
-                elif color == "yellow":
-                    yellow_count += 1
-                else:
-                    red_count += 1
+        # Draw wastes
+        for color_waste, color in enumerate(["green", "yellow", "red"]):
+            for pos in model.env.waste_positions(color_waste):
                 ax.scatter(
-                    agent.pos[0],
-                    agent.pos[1],
+                    pos[0],
+                    pos[1],
                     color=color,
                     marker="s",
                     edgecolors="black",
                     s=100,
                     alpha=0.5,
                 )
-            elif isinstance(agent, (greenagentclass, yellowagentclass, redagentclass)):
-                color = (
-                    "green"
-                    if isinstance(agent, greenagentclass)
-                    else "yellow"
-                    if isinstance(agent, yellowagentclass)
-                    else "red"
-                )
+
+        # Draw robot agents
+        for color_robot, color in enumerate(["green", "yellow", "red"]):
+            for agent in model.robots_by_color[color_robot]:
                 ax.scatter(
                     agent.pos[0],
                     agent.pos[1],
@@ -87,9 +55,9 @@ def visualize_simulation(model, steps=500, use_random_agents=True):
                 )
 
         # Update waste count history
-        waste_counts["green"].append(green_count)
-        waste_counts["yellow"].append(yellow_count)
-        waste_counts["red"].append(red_count)
+        counts = model.env.count_wastes()
+        for color in waste_counts:
+            waste_counts[color].append(counts[color])
 
         # Plot waste count trends
         ax_right.plot(waste_counts["green"], color="green", label="Green Waste")
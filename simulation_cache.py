@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Folders whose code doesn't take part in the simulations
+IGNORED_FOLDERS = {"outdated", "tests", "__pycache__"}
+
+
+def code_version(root=PROJECT_ROOT):
+    """Return a hash of every python source of the project, so that any change of the policies
+    or of the environment invalidates the cached results."""
+    digest = hashlib.sha256()
+    for folder, subfolders, files in os.walk(root):
+        subfolders[:] = sorted(
+            subfolder
+            for subfolder in subfolders
+            if subfolder not in IGNORED_FOLDERS and not subfolder.startswith(".")
+        )
+        for file in sorted(files):
+            if file.endswith(".py"):
+                path = os.path.join(folder, file)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+class SimulationCache:
+    """On-disk cache of the waste counts of simulations.
+
+    Each run is stored in its own file named after a hash of the config, the policy, the seed,
+    the number of steps, the stop conditions and the code version. When the cache grows over
+    max_bytes, the least recently used runs are deleted.
+    """
+
+    def __init__(self, directory, max_bytes=512 * 2**20, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version() if version is None else version
+        os.makedirs(directory, exist_ok=True)
+        self.size = sum(entry.stat().st_size for entry in self.__entries())
+
+    def key(self, config, policy, seed, steps, stop=None):
+        """Return the key of a run, stop being the description of its StopConditions."""
+        description = json.dumps(
+            {
+                "config": config,
+                "policy": policy,
+                "seed": seed,
+                "steps": steps,
+                "stop": stop,
+                "version": self.version,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the cached waste counts of a run, or None if the run is not cached."""
+        path = self.__path(key)
+        try:
+            counts = np.load(path)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+        os.utime(path)  # mark the run as recently used
+        return counts
+
+    def put(self, key, waste_counts):
+        """Store the (3, steps) waste counts of a run and evict the oldest runs if needed."""
+        path = self.__path(key)
+        tmp_path = path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, np.asarray(waste_counts, dtype=np.int32))
+        if os.path.exists(path):
+            self.size -= os.path.getsize(path)
+        os.replace(tmp_path, path)
+        self.size += os.path.getsize(path)
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used runs until the cache fits in max_bytes."""
+        if self.size <= self.max_bytes:
+            return
+        entries = sorted(self.__entries(), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self.size <= self.max_bytes:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            self.size -= size
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def __entries(self):
+        return [
+            entry
+            for entry in os.scandir(self.directory)
+            if entry.is_file() and entry.name.endswith(".npy")
+        ]
@@ -0,0 +1,60 @@
+import time
+
+
+class StopConditions:
+    """Conditions ending a simulation before its step budget.
+
+    - all_disposed: every waste has been disposed of (none left on the grid and no robot
+      carrying one), the waste counts can't change any more
+    - patience: neither the waste counts of the grid nor the wastes carried by the robots
+      changed during the last patience steps
+    - time_budget: the simulation has been running for more than time_budget seconds
+
+    reset must be called at the beginning of each simulation, then check after each step.
+    """
+
+    def __init__(self, all_disposed=True, patience=None, time_budget=None):
+        self.all_disposed = all_disposed
+        self.patience = patience
+        self.time_budget = time_budget
+        self.__start = None
+        self.__state = None
+        self.__last_progress = 0
+
+    def description(self):
+        """Return the conditions as a dict, used in the keys of the SimulationCache."""
+        return {
+            "all_disposed": self.all_disposed,
+            "patience": self.patience,
+            "time_budget": self.time_budget,
+        }
+
+    def reset(self, model):
+        self.__start = time.perf_counter()
+        self.__state = self.state(model)
+        self.__last_progress = 0
+
+    def check(self, model, step):
+        """Return the reason to stop after the given step (0 for the first one), or None."""
+        if self.all_disposed and model.all_wastes_disposed():
+            return "all_disposed"
+        if self.patience is not None:
+            state = self.state(model)
+            if state != self.__state:
+                self.__state = state
+                self.__last_progress = step + 1
+            elif step + 1 - self.__last_progress >= self.patience:
+                return "patience"
+        if (
+            self.time_budget is not None
+            and time.perf_counter() - self.__start > self.time_budget
+        ):
+            return "time_budget"
+        return None
+
+    @staticmethod
+    def state(model):
+        return (
+            tuple(model.world.waste_counts.tolist()),
+            tuple(robot.knowledge.carried for robot in model.robots()),
+        )
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from frontier import FrontierIndex
+from knowledge import UNEXPLORED
+
+SIZE = 15
+
+
+def reference_nearest(grid, pos, max_column=None, prefer_right=False):
+    """Nearest unexplored cell as the agents searched it before FrontierIndex."""
+    targets = np.argwhere(grid == UNEXPLORED)
+    if max_column is not None:
+        targets = targets[targets[:, 1] <= max_column]
+    if len(targets) == 0:
+        return None
+    targets[:, 0] = len(grid) - 1 - targets[:, 0]
+    x, y = pos
+    distances = np.abs(targets[:, 0] - x) + np.abs(targets[:, 1] - y)
+    # on equal distances, the upper cell wins, then the left (or right) one
+    columns = -targets[:, 1] if prefer_right else targets[:, 1]
+    return tuple(targets[np.lexsort((columns, -targets[:, 0], distances))[0]].tolist())
+
+
+def random_grid(rng, explored):
+    grid = np.full((SIZE, SIZE), UNEXPLORED, dtype=np.int8)
+    grid[rng.random((SIZE, SIZE)) < explored] = 0
+    return grid
+
+
+def check_queries(rng, grid, frontier):
+    for _ in range(5):
+        pos = tuple(rng.integers(SIZE, size=2).tolist())
+        for max_column in (None, int(rng.integers(SIZE))):
+            for prefer_right in (False, True):
+                expected = reference_nearest(grid, pos, max_column, prefer_right)
+                assert frontier.nearest(pos, max_column, prefer_right) == expected
+
+
+@pytest.mark.parametrize("seed", range(4))
+@pytest.mark.parametrize("explored", [0.0, 0.5, 0.95])
+def test_nearest_matches_the_argwhere_search(seed, explored):
+    rng = np.random.default_rng(seed)
+    grid = random_grid(rng, explored)
+    frontier = FrontierIndex(grid)
+    check_queries(rng, grid, frontier)
+    while (grid == UNEXPLORED).any():
+        kind = rng.integers(3)
+        if kind == 0:
+            row, column = rng.integers(SIZE, size=2).tolist()
+            grid[row, column] = 0
+            frontier.discard(row, column)
+        elif kind == 1:
+            row, column = rng.integers(SIZE - 2, size=2).tolist()
+            values = np.where(rng.random((3, 3)) < 0.7, 0, UNEXPLORED)
+            grid[row : row + 3, column : column + 3] = np.where(
+                values == UNEXPLORED, grid[row : row + 3, column : column + 3], values
+            )
+            frontier.discard_block(row, column, values)
+        else:
+            cells = rng.choice(SIZE * SIZE, size=8, replace=False)
+            grid.reshape(-1)[cells] = 0
+            frontier.discard_cells(cells)
+        assert len(frontier) == (grid == UNEXPLORED).sum()
+        check_queries(rng, grid, frontier)
+    assert frontier.nearest((0, 0)) is None
+
+
+def test_ties_go_to_the_upper_then_left_or_right_cell():
+    grid = np.zeros((5, 5), dtype=np.int8)
+    # two cells at distance 1 from the center (x=2, y=2), then four at distance 2
+    for row, column in [(2, 1), (2, 3), (1, 1), (1, 3), (3, 1), (3, 3)]:
+        grid[row, column] = UNEXPLORED
+    frontier = FrontierIndex(grid)
+    assert frontier.nearest((2, 2)) == reference_nearest(grid, (2, 2)) == (2, 1)
+    assert frontier.nearest((2, 2), prefer_right=True) == (2, 3)
+    frontier.discard(2, 1)
+    frontier.discard(2, 3)
+    grid[2, [1, 3]] = 0
+    for prefer_right in (False, True):
+        expected = reference_nearest(grid, (2, 2), prefer_right=prefer_right)
+        assert frontier.nearest((2, 2), prefer_right=prefer_right) == expected
+    assert frontier.nearest((2, 2), max_column=2) == (3, 1)
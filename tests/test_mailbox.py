@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from mailbox.Mailbox import Mailbox
+from message.Message import Message
+from message.MessagePerformative import MessagePerformative
+
+PERFORMATIVES = list(MessagePerformative)[:3]
+SENDERS = [1, 2, 3, 4]
+
+
+class ReferenceMailbox:
+    """Mailbox kept as plain lists, searched message by message as before the indexes."""
+
+    def __init__(self, max_messages, max_age, clock):
+        self.max_messages = max_messages
+        self.max_age = max_age
+        self.clock = clock
+        self.unread = []
+        self.read = []
+        self.steps = []  # arrival step of each kept message, read ones first
+
+    def evict(self):
+        while len(self.steps) > 0 and (
+            (self.max_messages is not None and len(self.steps) > self.max_messages)
+            or (self.max_age is not None and self.steps[0] < self.clock() - self.max_age)
+        ):
+            del self.steps[0]
+            del (self.read if len(self.read) > 0 else self.unread)[0]
+
+    def receive_messages(self, message):
+        self.unread.append(message)
+        self.steps.append(self.clock())
+        self.evict()
+
+    def get_new_messages(self):
+        self.evict()
+        unread, self.unread = self.unread, []
+        self.read += unread
+        return unread
+
+    def get_messages(self):
+        self.get_new_messages()
+        return list(self.read)
+
+    def get_messages_from_performative(self, performative):
+        self.evict()
+        return [m for m in self.unread + self.read if m.get_performative() == performative]
+
+    def get_messages_from_exp(self, exp):
+        self.evict()
+        return [m for m in self.unread + self.read if m.get_exp() == exp]
+
+
+@pytest.mark.parametrize(
+    "max_messages, max_age", [(None, None), (5, None), (None, 3), (6, 4), (1, None)]
+)
+@pytest.mark.parametrize("seed", range(3))
+def test_mailbox_matches_the_list_model(max_messages, max_age, seed):
+    rng = np.random.default_rng(seed)
+    step = [0]
+    mailbox = Mailbox(max_messages, max_age, clock=lambda: step[0])
+    reference = ReferenceMailbox(max_messages, max_age, clock=lambda: step[0])
+    for _ in range(400):
+        kind = rng.integers(6)
+        if kind <= 1:
+            message = Message(
+                SENDERS[rng.integers(len(SENDERS))],
+                0,
+                PERFORMATIVES[rng.integers(len(PERFORMATIVES))],
+                None,
+            )
+            mailbox.receive_messages(message)
+            reference.receive_messages(message)
+        elif kind == 2:
+            step[0] += 1
+        elif kind == 3:
+            assert mailbox.get_new_messages() == reference.get_new_messages()
+        elif kind == 4:
+            performative = PERFORMATIVES[rng.integers(len(PERFORMATIVES))]
+            assert mailbox.get_messages_from_performative(
+                performative
+            ) == reference.get_messages_from_performative(performative)
+            exp = SENDERS[rng.integers(len(SENDERS))]
+            assert mailbox.get_messages_from_exp(exp) == reference.get_messages_from_exp(exp)
+        else:
+            assert mailbox.get_messages() == reference.get_messages()
+
+
+def test_eviction_drops_the_oldest_messages_of_every_index():
+    mailbox = Mailbox(max_messages=2)
+    messages = [Message(k % 2, 0, MessagePerformative.PROPOSE, k) for k in range(3)]
+    for message in messages:
+        mailbox.receive_messages(message)
+    # the first message is dropped, the unread ones come before the read ones in the indexes
+    assert mailbox.get_messages_from_performative(MessagePerformative.PROPOSE) == messages[1:]
+    assert mailbox.get_messages_from_exp(0) == [messages[2]]
+    mailbox.get_new_messages()
+    mailbox.receive_messages(messages[0])
+    assert mailbox.get_messages_from_performative(MessagePerformative.PROPOSE) == [
+        messages[0],
+        messages[2],
+    ]
+    assert mailbox.get_messages() == [messages[2], messages[0]]
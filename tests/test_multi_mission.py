@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from batch_simulation import visualize_simulation
+from layout import ZoneLayout
+from model import RobotMission
+from multi_mission import MultiMission
+from stop_conditions import StopConditions
+
+N_AGENTS = {"green": 3, "yellow": 3, "red": 3}
+N_WASTES = {"green": 12, "yellow": 8, "red": 8}
+SEEDS = [0, 1, 2]
+WALLS = [
+    {"columns": [0.5, [0.5, 1]], "rows": [0.2, 0.8]},
+    {"columns": [0.7, 0.9], "rows": [0.3, [0.3, 1]]},
+]
+
+
+def serial_missions(layout=None):
+    missions = [
+        RobotMission(
+            N_AGENTS, N_WASTES, 20, seed=seed, step_policy="simultaneous", layout=layout
+        )
+        for seed in SEEDS
+    ]
+    for mission in missions:
+        mission.get_messages_service().set_instant_delivery(True)
+    return missions
+
+
+def multi_mission(layout=None):
+    multi = MultiMission(SEEDS, N_AGENTS, N_WASTES, 20, layout=layout)
+    for mission in multi.missions:
+        mission.get_messages_service().set_instant_delivery(True)
+    return multi
+
+
+def state(mission):
+    robots = sorted(
+        (robot.unique_id, robot.pos, robot.knowledge.carried) for robot in mission.robots()
+    )
+    return robots, mission.world.wastes.tolist(), mission.world.waste_color.tolist()
+
+
+@pytest.mark.parametrize("layout", [None, ZoneLayout(walls=WALLS)])
+def test_lockstep_gives_the_serial_runs(layout):
+    missions = serial_missions(layout)
+    multi = multi_mission(layout)
+    for _ in range(200):
+        for mission in missions:
+            mission.step()
+        waste_counts = multi.step()
+        for k, mission in enumerate(missions):
+            assert state(multi.missions[k]) == state(mission)
+            assert np.array_equal(waste_counts[k], mission.world.waste_counts)
+            assert multi.missions[k].steps == mission.steps
+            assert multi.missions[k].world.waste_index == mission.world.waste_index
+
+
+def test_lockstep_steps_the_running_missions_only():
+    missions = serial_missions()
+    multi = multi_mission()
+    for step in range(100):
+        for mission in missions[:2] if step >= 50 else missions:
+            mission.step()
+        multi.step([0, 1] if step >= 50 else None)
+    for k, mission in enumerate(missions):
+        assert state(multi.missions[k]) == state(mission)
+
+
+def test_lockstep_run_stops_like_serial_runs():
+    serial = np.stack(
+        [
+            visualize_simulation(mission, 300, True, stop=StopConditions(patience=20))
+            for mission in serial_missions()
+        ],
+        axis=1,
+    )
+    counts = multi_mission().run(300, stop=StopConditions(patience=20))
+    assert np.array_equal(counts, serial)
+
+
+def test_releases_on_shared_cells_match_step_batch():
+    mission = serial_missions()[0]
+    multi = multi_mission()
+    twin = multi.missions[0]
+    disposal = tuple(np.argwhere(mission.world.is_waste_disposal == 1)[0].tolist())
+    for model in (mission, twin):
+        robots = model.robots()
+        model.world.add_waste(disposal, 2)
+        # three robots on the cell of the first one, two on a cell of the disposal zone
+        for robot, cell in zip(robots[1:5], [robots[0].pos] * 2 + [disposal] * 2):
+            model.world.move_robot(robot.pos, cell)
+            robot.pos = cell
+    actions = [1, 2, 3, 1, 2, 4, 5, 6, 7]
+    expected = mission.env.step_batch(mission.robots(), actions, policy="simultaneous")
+    robots = twin.robots()
+    positions = np.array([robot.pos for robot in robots])
+    _, neighbourhoods, success = multi.stack.step_batch(
+        np.zeros(len(robots), dtype=np.intp), positions, np.array(actions)
+    )
+    assert np.array_equal(neighbourhoods, expected[0])
+    assert np.array_equal(success, expected[1])
+    assert state(twin)[1:] == state(mission)[1:]
+    assert np.array_equal(twin.world.waste_counts, mission.world.waste_counts)
+    assert twin.world.waste_index == mission.world.waste_index
@@ -0,0 +1,78 @@
+import pytest
+
+from model import RobotMission
+from world import COLOR_WASTE, EMPTY
+
+N_AGENTS = {"green": 3, "yellow": 3, "red": 3}
+N_WASTES = {"green": 12, "yellow": 8, "red": 8}
+STEPS = 300
+
+
+def run(**kwargs):
+    """Run the default config and return the model and the positions of the robots at each step."""
+    model = RobotMission(N_AGENTS, N_WASTES, 20, seed=0, **kwargs)
+    model.get_messages_service().set_instant_delivery(True)
+    positions = []
+    for _ in range(STEPS):
+        model.step()
+        positions.append([robot.pos for robot in model.robots()])
+    return model, positions
+
+
+def test_cache_is_off_by_default():
+    model = RobotMission(N_AGENTS, N_WASTES, 20, seed=0)
+    assert model.env.observations is None
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"use_random_agents": False},
+        {"use_random_agents": True},
+        {"use_random_agents": True, "step_policy": "sequential"},
+        {"use_random_agents": True, "step_policy": "simultaneous"},
+    ],
+)
+def test_cache_gives_the_same_runs(kwargs):
+    cached, cached_positions = run(cache_observations=True, **kwargs)
+    _, positions = run(**kwargs)
+    assert cached_positions == positions
+    stats = cached.env.observations.stats()
+    assert stats["hits"] + stats["misses"] == STEPS * len(cached.robots())
+
+
+def still_robot(model):
+    """Return a robot at least two cells away from the borders of the grid."""
+    for robot in model.robots():
+        x, y = robot.pos
+        if 2 <= x < model.world.width - 2 and 2 <= y < model.world.height - 2:
+            return robot
+    raise AssertionError("every robot is next to a border")
+
+
+def test_still_robot_hits_while_its_cells_are_unchanged():
+    model = RobotMission(N_AGENTS, N_WASTES, 20, seed=0, cache_observations=True)
+    robot = still_robot(model)
+    x, y = robot.pos
+    model.env.step(robot, 8)
+    misses = model.env.observations.misses
+    # a waste dropped two cells away leaves the neighbourhood of the robot unchanged
+    model.world.add_waste((x + 2, y), 0)
+    model.env.step(robot, 8)
+    assert model.env.observations.misses == misses
+    assert model.env.observations.hits == 1
+
+
+@pytest.mark.parametrize("policy", ["sequential", "simultaneous"])
+def test_pick_around_a_robot_misses(policy):
+    model = RobotMission(N_AGENTS, N_WASTES, 20, seed=0, cache_observations=True)
+    robot = still_robot(model)
+    model.world.add_waste(robot.pos, 0)
+    model.env.step_batch([robot], [8], policy=policy)
+    neighbourhoods, _ = model.env.step_batch([robot], [8], policy=policy)
+    assert model.env.observations.hits == 1
+    assert neighbourhoods[0][COLOR_WASTE][1, 1] == 0
+    misses = model.env.observations.misses
+    neighbourhoods, _ = model.env.step_batch([robot], [0], policy=policy)
+    assert model.env.observations.misses == misses + 1
+    assert neighbourhoods[0][COLOR_WASTE][1, 1] == EMPTY
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+from layout import ZoneLayout
+from model import RobotMission
+from world import IS_WALL, RADIOACTIVITY
+
+N_AGENTS = {"green": 3, "yellow": 3, "red": 3}
+N_WASTES = {"green": 12, "yellow": 8, "red": 8}
+WALLS = [
+    {"columns": [0.5, [0.5, 1]], "rows": [0.2, 0.8]},
+    {"columns": [0.1, 0.25], "rows": [0.6, [0.6, 1]]},
+    {"columns": [0.7, 0.9], "rows": [0.3, [0.3, 1]]},
+]
+# wall covering most of the column where the green robots drop the yellow wastes
+DEPOSIT_WALL = [{"columns": [[0, 6], [0, 7]], "rows": [0, 0.9]}]
+# action moving a robot of the mesa grid by each offset
+MOVES = {(0, 1): 4, (1, 0): 5, (0, -1): 6, (-1, 0): 7}
+
+
+def mission(seed=0, **kwargs):
+    model = RobotMission(
+        N_AGENTS, N_WASTES, 20, seed=seed, layout=ZoneLayout(walls=WALLS), **kwargs
+    )
+    model.get_messages_service().set_instant_delivery(True)
+    return model
+
+
+def next_to_wall(model):
+    """Return a robot, a free cell next to it where a wall can be built, and the move to it."""
+    world = model.world
+    for robot in model.robots():
+        x, y = robot.pos
+        for (dx, dy), action in MOVES.items():
+            cell = (x + dx, y + dy)
+            if world.in_bounds(cell) and world.robots[cell] == 0:
+                return robot, cell, action
+    raise AssertionError("every robot is surrounded")
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"use_random_agents": False},
+        {"use_random_agents": True},
+        {"use_random_agents": True, "step_policy": "sequential"},
+        {"use_random_agents": True, "step_policy": "simultaneous"},
+    ],
+)
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_no_robot_stands_on_a_wall(kwargs, seed):
+    model = mission(seed, **kwargs)
+    walls = model.world.is_wall == 1
+    assert walls.any()
+    for _ in range(300):
+        model.step()
+        assert not any(walls[robot.pos] for robot in model.robots())
+        assert model.world.robots[walls].sum() == 0
+
+
+def test_moves_into_walls_are_rejected():
+    model = mission()
+    robot, cell, action = next_to_wall(model)
+    model.world.set_wall(cell)
+    pos = robot.pos
+    model.env.step(robot, action)
+    assert robot.pos == pos
+
+
+def test_simultaneous_moves_into_walls_are_rejected():
+    model = mission()
+    robot, cell, action = next_to_wall(model)
+    model.world.set_wall(cell)
+    pos = robot.pos
+    model.env.step_batch([robot], [action], policy="simultaneous")
+    assert robot.pos == pos
+    assert model.world.robots[pos] == 1
+
+
+def test_wall_map_includes_walls_and_borders():
+    model = mission()
+    robot, cell, _ = next_to_wall(model)
+    model.world.set_wall(cell)
+    robot.knowledge.observe(model.env.get_info(robot.pos))
+    observed = model.world.neighbourhoods([robot.pos])[0]
+    expected = (observed[RADIOACTIVITY] == -1) | (observed[IS_WALL] == 1)
+    assert np.array_equal(robot.wall_map(), expected)
+    assert robot.wall_map().sum() > robot.border_map().sum()
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_deposit_slots_skip_walls(seed):
+    model = RobotMission(
+        N_AGENTS,
+        N_WASTES,
+        20,
+        use_random_agents=False,
+        seed=seed,
+        layout=ZoneLayout(walls=DEPOSIT_WALL),
+    )
+    model.get_messages_service().set_instant_delivery(True)
+    walls = model.world.is_wall == 1
+    assert walls[model.deposit_columns[0]].any()
+    for _ in range(200):
+        model.step()
+        for slots in (model.yellow_deposit_slots, model.red_deposit_slots):
+            for column, rows in slots.free.items():
+                assert not walls[column, rows].any()
+            for robot in model.robots():
+                cell = slots.nearest(robot.get_pos())
+                assert cell is None or not walls[cell[1] - 1, cell[0] - 1]
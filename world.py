@@ -0,0 +1,174 @@
+import numpy as np
+
+EMPTY = -1
+N_COLORS = 3
+
+# Channels of the observation stack, in the order of the observation dict
+RADIOACTIVITY = 0
+COLOR_WASTE = 1
+IS_WASTE_DISPOSAL = 2
+IS_WALL = 3
+OTHER_ROBOTS = 4
+CHANNELS = ["radioactivity", "color_waste", "is_waste_disposal", "is_wall", "other_robots"]
+# Value seen by the robots outside of the grid for each channel
+PADDING = [-1, EMPTY, -1, 0, 0]
+
+# Offsets giving the 3*3 neighbourhood in the orientation used by the robots:
+# row 0 is the cell above the robot, column 0 the cell on its left
+_ROWS_DY = np.array([2, 1, 0])
+_COLUMNS_DX = np.array([0, 1, 2])
+
+
+def neighbourhood_cells(positions):
+    """Return the indices in the padded layers of the 3*3 neighbourhoods of several positions,
+    in the orientation of the observations (two arrays of shape n * 3 * 3)."""
+    positions = np.asarray(positions, dtype=np.intp).reshape(-1, 2)
+    xs = positions[:, 0, None, None] + _COLUMNS_DX[None, None, :]
+    ys = positions[:, 1, None, None] + _ROWS_DY[None, :, None]
+    return xs, ys
+
+
+class WorldState:
+    """Dense array representation of the map.
+
+    The observable layers are stored in a single stack padded with one cell on each side,
+    so that the neighbourhood of any cell is a 3*3 slice of the stack. Every layer attribute
+    is a view on the inside of the stack, indexed like the mesa grid (layer[x, y] for pos = (x, y)).
+    The stack, wastes and waste counts can be given, to store the map in views of larger arrays
+    (see multi_mission.WorldStack), their content is overwritten.
+
+    attr:
+        layers: the padded stack of observable layers (shape 5 * (width + 2) * (height + 2))
+        radioactivity: radioactivity level of each cell
+        is_waste_disposal: 1 if the cell belongs to the waste disposal zone, else 0
+        is_wall: 1 if the cell is a wall, else 0
+        waste_color: color of the last waste dropped on the cell, EMPTY if there is none
+        robots: number of robots standing on each cell
+        wastes: number of wastes of each color on each cell (shape 3 * width * height)
+        waste_counts: number of wastes of each color lying on the grid
+        waste_index: for each color, the set of positions holding at least one waste of this color
+        walls_version: incremented each time the walls change
+        waste_listeners: callables notified with the position of each cell whose wastes change
+        cell_listeners: callables notified with the position of each cell whose observable
+            content changes (wastes, robots or walls)
+    """
+
+    def __init__(self, width, height, layers=None, wastes=None, waste_counts=None):
+        self.width = width
+        self.height = height
+        if layers is None:
+            layers = np.empty((len(CHANNELS), width + 2, height + 2))
+        if wastes is None:
+            wastes = np.zeros((N_COLORS, width, height), dtype=np.int32)
+        if waste_counts is None:
+            waste_counts = np.zeros(N_COLORS, dtype=np.int64)
+        self.layers = layers
+        for channel, value in enumerate(PADDING):
+            self.layers[channel] = value
+        inside = (slice(1, width + 1), slice(1, height + 1))
+        self.layers[(slice(None),) + inside] = 0
+        self.layers[(COLOR_WASTE,) + inside] = EMPTY
+        self.radioactivity = self.layers[(RADIOACTIVITY,) + inside]
+        self.waste_color = self.layers[(COLOR_WASTE,) + inside]
+        self.is_waste_disposal = self.layers[(IS_WASTE_DISPOSAL,) + inside]
+        self.is_wall = self.layers[(IS_WALL,) + inside]
+        self.robots = self.layers[(OTHER_ROBOTS,) + inside]
+        self.wastes = wastes
+        self.wastes[:] = 0
+        self.waste_counts = waste_counts
+        self.waste_counts[:] = 0
+        self.waste_index = [set() for _ in range(N_COLORS)]
+        self.walls_version = 0
+        self.waste_listeners = []
+        self.cell_listeners = []
+
+    def in_bounds(self, pos):
+        x, y = pos
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def set_wall(self, pos, is_wall=1):
+        self.is_wall[pos] = is_wall
+        self.walls_version += 1
+        self.__notify_cell(pos)
+
+    def add_waste_listener(self, listener):
+        self.waste_listeners.append(listener)
+
+    def add_cell_listener(self, listener):
+        self.cell_listeners.append(listener)
+
+    def add_waste(self, pos, color):
+        self.wastes[color][pos] += 1
+        self.waste_color[pos] = color
+        self.waste_counts[color] += 1
+        self.waste_index[color].add(pos)
+        self.__notify(pos)
+
+    def remove_wastes(self, pos):
+        """Remove every waste lying on the cell."""
+        if self.waste_color[pos] == EMPTY:
+            return
+        cell_wastes = self.wastes[:, pos[0], pos[1]]
+        self.waste_counts -= cell_wastes
+        for color in np.flatnonzero(cell_wastes):
+            self.waste_index[color].discard(pos)
+        cell_wastes[:] = 0
+        self.waste_color[pos] = EMPTY
+        self.__notify(pos)
+
+    def wastes_changed(self, pos):
+        """Follow a change of the wastes of the cell written directly in the arrays (see
+        multi_mission.WorldStack): update the waste index and notify the listeners."""
+        cell_wastes = self.wastes[:, pos[0], pos[1]]
+        for color in range(N_COLORS):
+            if cell_wastes[color] > 0:
+                self.waste_index[color].add(pos)
+            else:
+                self.waste_index[color].discard(pos)
+        self.__notify(pos)
+
+    def robots_changed(self, pos):
+        """Notify the cell listeners of a change of the robots of the cell written directly in
+        the robots layer."""
+        self.__notify_cell(pos)
+
+    def __notify(self, pos):
+        for listener in self.waste_listeners:
+            listener(pos)
+        self.__notify_cell(pos)
+
+    def __notify_cell(self, pos):
+        for listener in self.cell_listeners:
+            listener(pos)
+
+    def place_robot(self, pos):
+        self.robots[pos] += 1
+        self.__notify_cell(pos)
+
+    def move_robot(self, old_pos, new_pos):
+        self.robots[old_pos] -= 1
+        self.robots[new_pos] += 1
+        self.__notify_cell(old_pos)
+        self.__notify_cell(new_pos)
+
+    def neighbourhood(self, pos):
+        """Return a copy of the 3*3 neighbourhood of pos for every channel (shape 5 * 3 * 3)."""
+        x, y = pos
+        return self.layers[:, x : x + 3, y : y + 3].transpose(0, 2, 1)[:, ::-1].copy()
+
+    def neighbourhoods(self, positions):
+        """Return the neighbourhoods of several positions at once (shape n * 5 * 3 * 3)."""
+        xs, ys = neighbourhood_cells(positions)
+        return np.moveaxis(self.layers[:, xs, ys], 0, 1)
+
+    def count_wastes(self):
+        """Return the number of wastes of each color lying on the grid."""
+        return self.waste_counts.copy()
+
+    def waste_positions(self, color):
+        """Return the positions of the cells holding at least one waste of the given color."""
+        return list(self.waste_index[color])
+
+    def radioactivity_map(self):
+        """Return the map used for rendering, indexed [y, x] with the disposal zone set to 2."""
+        return np.where(self.is_waste_disposal == 1, 2, self.radioactivity).T